@@ -108,6 +108,37 @@ class ConcatenatedConstraints(Constraint):
         self.sizes = sizes
         super().__init__()
 
+        # The bijective transform is built on first use (see transform), along with
+        # the constraints and sizes it was built from:
+        self._transform = None
+        self._transform_constraints = ()
+        self._transform_sizes = None
+
+    @property
+    def transform(self) -> "ConcatenatedTransforms":
+        """
+        The bijective transform to this constraint, built from the transforms of the
+        individual constraints. This is cached so it can be reused (e.g., across SVI
+        iterations), and it is rebuilt if the constraints or sizes are changed.
+        """
+        constraints = tuple(self.constraints)
+        sizes = None if self.sizes is None else tuple(self.sizes)
+        if (
+            self._transform is None
+            or sizes != self._transform_sizes
+            or len(constraints) != len(self._transform_constraints)
+            or any(
+                c1 is not c2
+                for c1, c2 in zip(constraints, self._transform_constraints, strict=True)
+            )
+        ):
+            self._transform = ConcatenatedTransforms(
+                [biject_to(c) for c in constraints], sizes=self.sizes, axis=-1
+            )
+            self._transform_constraints = constraints
+            self._transform_sizes = sizes
+        return self._transform
+
     @property
     def event_dim(self):
         # # We just grab the first constraint, because all event dims should be the same
@@ -221,5 +252,4 @@ class ConcatenatedTransforms(Transform):
 
 @biject_to.register(ConcatenatedConstraints)
 def _transform_to_concatenated(constraint):
-    transforms = [biject_to(c) for c in constraint.constraints]
-    return ConcatenatedTransforms(transforms, sizes=constraint.sizes, axis=-1)
+    return constraint.transform
@@ -1,13 +1,151 @@
 import jax
 import jax.numpy as jnp
 import numpyro.distributions as dist
-from jax.scipy.special import logsumexp
+from jax.scipy.special import log_ndtr, logsumexp, ndtr, ndtri
 from jax.typing import ArrayLike
 
 __all__ = ["IndependentGMM"]
 
 
+def _log_truncated_mass(
+    locs: ArrayLike, scales: ArrayLike, low: ArrayLike, high: ArrayLike
+) -> jax.Array:
+    """
+    The log of the probability mass of Normal(locs, scales) between low and high,
+    evaluated for all components and dimensions at once.
+    """
+    alpha = (low - locs) / scales
+    beta = (high - locs) / scales
+
+    # If both bounds are above the mean, use the symmetry of the Normal to work with the
+    # (more precise) lower tail instead, so that the mass is Phi(b) - Phi(a) with a < b:
+    flip = alpha > 0
+    a = jnp.where(flip, -beta, alpha)
+    b = jnp.where(flip, -alpha, beta)
+
+    log_Phi_a = log_ndtr(a)
+    log_Phi_b = log_ndtr(b)
+    return log_Phi_b + jnp.log(-jnp.expm1(log_Phi_a - log_Phi_b))
+
+
+def _standard_truncated_icdf(u: jax.Array, a: jax.Array, b: jax.Array) -> jax.Array:
+    """
+    The inverse CDF of the standard Normal truncated to the interval (a, b), evaluated
+    at u in [0, 1]. The bounds should be reflected as in _log_truncated_mass(), so that
+    a is at or below the mean.
+    """
+    # Note: the CDF value must be strictly between 0 and 1, otherwise ndtri() returns
+    # an infinite value:
+    tiny = jnp.finfo(u.dtype).tiny
+    Phi_a = ndtr(a)
+    Phi_b = ndtr(b)
+    p = Phi_a + u * (Phi_b - Phi_a)
+    z = ndtri(jnp.clip(p, tiny, jnp.nextafter(jnp.ones((), u.dtype), 0)))
+
+    # If the interval is so far in the tail that the CDF underflows, all of the
+    # probability mass is right at the inner bound:
+    return jnp.where(Phi_b == Phi_a, b, z)
+
+
+@jax.jit
+def _precompute_components(
+    locs: ArrayLike, scales: ArrayLike, low: ArrayLike, high: ArrayLike
+) -> tuple[jax.Array, ...]:
+    """
+    Broadcast the component locs and scales against each other (to the full (D, K)
+    shape), broadcast the bounds to the same shape, and compute the log truncation mass
+    of each component along with the (truncated) Normal log normalization. This is
+    compiled once per input shape, so that repeatedly constructing the distribution
+    (e.g., inside a model) is cheap. The tail mass is computed in (at least) single
+    precision and then cast to the parameter type.
+    """
+    locs, scales = jnp.broadcast_arrays(locs, scales)
+    low = jnp.broadcast_to(low, locs.shape).astype(locs.dtype)
+    high = jnp.broadcast_to(high, locs.shape).astype(locs.dtype)
+
+    dtype = jnp.promote_types(locs.dtype, jnp.float32)
+    log_mass = _log_truncated_mass(locs.astype(dtype), scales.astype(dtype), low, high)
+    log_mass = log_mass.astype(locs.dtype)
+
+    log_norm = -jnp.log(scales) - 0.5 * jnp.log(2 * jnp.pi) - log_mass
+    return locs, scales, low, high, log_mass, log_norm
+
+
+@jax.jit
+def _truncated_moments(
+    locs: jax.Array,
+    scales: jax.Array,
+    low: jax.Array,
+    high: jax.Array,
+    log_mass: jax.Array,
+) -> tuple[jax.Array, jax.Array]:
+    """
+    The mean and variance of the truncated Normal components, given the log
+    probability mass within the bounds (see _log_truncated_mass()). Infinite bounds
+    don't contribute to the moments.
+    """
+    alpha = (low - locs) / scales
+    beta = (high - locs) / scales
+    mass = jnp.exp(log_mass)
+
+    phi_alpha = jnp.exp(-0.5 * alpha**2) / jnp.sqrt(2 * jnp.pi)
+    phi_beta = jnp.exp(-0.5 * beta**2) / jnp.sqrt(2 * jnp.pi)
+    alpha_phi_alpha = jnp.where(jnp.isfinite(alpha), alpha * phi_alpha, 0.0)
+    beta_phi_beta = jnp.where(jnp.isfinite(beta), beta * phi_beta, 0.0)
+
+    shift = (phi_alpha - phi_beta) / mass
+    mean = locs + scales * shift
+    variance = scales**2 * (1 + (alpha_phi_alpha - beta_phi_beta) / mass - shift**2)
+    return mean, variance
+
+
+# Note: the log-density kernels below are compiled so that evaluating the distribution
+# outside of a jax.jit-compiled function (e.g., for small batches of data) is a single
+# dispatch rather than one per elementwise operation. value has shape (..., D, 1).
+@jax.jit
+def _component_log_probs(
+    value: jax.Array,
+    locs: jax.Array,
+    scales: jax.Array,
+    log_norm: jax.Array,
+    support: dist.constraints.Constraint,
+) -> jax.Array:
+    z = (value - locs) / scales
+    return jnp.where(support.check(value), -0.5 * z**2 + log_norm, -jnp.inf)
+
+
+@jax.jit
+def _log_prob(
+    value: jax.Array,
+    locs: jax.Array,
+    scales: jax.Array,
+    log_mix_minus_tail: jax.Array,
+    support: dist.constraints.Constraint,
+) -> jax.Array:
+    # Note: this evaluates the Normal log-densities of all components in a single
+    # expression (summed over dimensions), instead of summing component_log_probs()
+    z = (value - locs) / scales
+    ln_p = -0.5 * jnp.sum(z**2, axis=-2) + log_mix_minus_tail
+    ln_p = jnp.where(support.check(value).all(axis=-2), ln_p, -jnp.inf)
+    return logsumexp(ln_p, axis=-1)
+
+
 class IndependentGMM(dist.MixtureSameFamily):
+    # Note: these are needed so that the distribution survives being flattened and
+    # unflattened by JAX (e.g., when passed into a jax.jit-compiled function) without
+    # re-running the precomputations in __init__:
+    pytree_data_fields = (
+        "_locs",
+        "_scales",
+        "_low",
+        "_high",
+        "_support",
+        "_log_diff_tail_probs",
+        "_log_norm",
+        "_log_mix_minus_tail",
+    )
+    pytree_aux_fields = ("_D", "_K", "_dim_dim")
+
     def __init__(
         self,
         mixing_distribution: dist.CategoricalLogits | dist.CategoricalProbs,
@@ -16,6 +154,7 @@ class IndependentGMM(dist.MixtureSameFamily):
         low: ArrayLike | None = None,
         high: ArrayLike | None = None,
         *,
+        dtype: jnp.dtype | None = None,
         validate_args=True,
     ):
         """
@@ -40,6 +179,22 @@ class IndependentGMM(dist.MixtureSameFamily):
         high
             Upper bounds for each dimension. This should either be a scalar or have
             shape (D,) where D is the dimensionality of the data.
+        dtype (optional)
+            The floating point type to store the parameters (and bounds) as. The
+            default is the default JAX float type, i.e. float32 unless 64-bit precision
+            is enabled with ``jax.config.update("jax_enable_x64", True)``. The
+            precomputed truncation mass and log-densities follow this type.
+
+        Notes
+        -----
+        To evaluate the distribution for a batch of parameter values (e.g., posterior
+        samples), construct it inside a function and use ``jax.vmap`` over the
+        parameters. For example, with ``locs`` of shape (N, D, K)::
+
+            jax.vmap(lambda l: IndependentGMM(mix, l, scales).log_prob(value))(locs)
+
+        Instances with the same D and K can also be stacked with
+        ``jax.tree_util.tree_map`` and mapped over directly.
         """
         # K = mixture components, D = dimensions
         # - event_shape is the dimensionality of the data - number of dependent
@@ -55,14 +210,44 @@ class IndependentGMM(dist.MixtureSameFamily):
             raise ValueError(msg)
         self._D, self._K = combined_shape
 
-        component_kwargs = {"loc": locs, "scale": scales}
-        if low is not None:
-            component_kwargs["low"] = low
-        if high is not None:
-            component_kwargs["high"] = high
+        # Scalar bounds are passed through as-is (they are cast and broadcast in the
+        # compiled precomputation below), so only array bounds need converting here:
+        dtype = jnp.result_type(float) if dtype is None else dtype
+        if low is not None and jnp.ndim(low) > 0:
+            low = jnp.asarray(low, dtype=dtype)
+        if high is not None and jnp.ndim(high) > 0:
+            high = jnp.asarray(high, dtype=dtype)
 
-        component = dist.TruncatedNormal(**component_kwargs)
-        component._batch_shape = (self._D, self._K)
+        # The truncation only depends on the parameters, so compute the log of the
+        # probability mass within the bounds for all components once here. The bounds
+        # are stored with the full (D, K) shape (and infinite if not specified):
+        (
+            self._locs,
+            self._scales,
+            self._low,
+            self._high,
+            self._log_diff_tail_probs,
+            self._log_norm,
+        ) = _precompute_components(
+            jnp.asarray(locs, dtype=dtype),
+            jnp.asarray(scales, dtype=dtype),
+            -jnp.inf if low is None else low,
+            jnp.inf if high is None else high,
+        )
+
+        # The truncation is handled above and in component_log_probs(), so the mixture
+        # is constructed with plain (diagonal) Normal components (see also
+        # component_distribution), and only the support depends on the bounds:
+        if low is None and high is None:
+            self._support = dist.constraints.real
+        elif low is None:
+            self._support = dist.constraints.less_than(high)
+        elif high is None:
+            self._support = dist.constraints.greater_than(low)
+        else:
+            self._support = dist.constraints.interval(low, high)
+
+        component = dist.Normal(self._locs, self._scales)
         super().__init__(
             mixing_distribution=mixing_distribution,
             component_distribution=component,
@@ -73,21 +258,30 @@ class IndependentGMM(dist.MixtureSameFamily):
         self._batch_shape = ()
         self._event_shape = (self._D,)
 
+        # The log mixing weights don't change between log_prob() calls either, so fold
+        # the (total, over dimensions) truncation mass and Normal normalization of each
+        # component into them:
+        self._log_mix_minus_tail = jax.nn.log_softmax(
+            jnp.asarray(self.mixing_distribution.logits, dtype=dtype)
+        ) + self._log_norm.sum(axis=self._dim_dim)
+
     @property
     def mixture_dim(self):
         return -1
 
     @property
     def support(self):
-        # TODO: it's possible this is not correct. The component distribution support
-        # may not be a vector interval like it needs to be? Anyways, if we see issues
-        # with using this distribution, audit the support!
-        if self.component_distribution.support is not None:
-            return self.component_distribution.support
-        return dist.constraints.real
+        # TODO: it's possible this is not correct. The support may not be a vector
+        # interval like it needs to be? Anyways, if we see issues with using this
+        # distribution, audit the support!
+        return self._support
 
-    def component_log_probs(self, value: ArrayLike) -> jax.Array:
-        value = jnp.array(value)
+    def _prepare_value(self, value: ArrayLike) -> jax.Array:
+        """
+        Validate the input values and return them with shape (..., D, 1), i.e. ready
+        to broadcast against the (D, K) component parameters.
+        """
+        value = jnp.asarray(value)
         value = jnp.atleast_2d(value.T).T
 
         if value.shape[-1] != self._D:
@@ -97,22 +291,71 @@ class IndependentGMM(dist.MixtureSameFamily):
             )
             raise ValueError(msg)
 
-        tmp = jnp.expand_dims(value, self.mixture_dim)
-        component_log_probs = self.component_distribution.log_prob(tmp)
+        return jnp.expand_dims(value, self.mixture_dim)
 
-        value = jnp.expand_dims(value, axis=-1)
-        return jnp.where(
-            self.component_distribution.support.check(value),
-            component_log_probs,
-            -jnp.inf,
+    @property
+    def component_distribution(self) -> dist.Distribution:
+        # Note: the mixture is constructed with plain Normal components (see
+        # __init__()), but the truncated components are returned here, so that the
+        # inherited methods that use them (e.g., cdf()) respect the bounds:
+        return dist.TruncatedNormal(
+            self._locs, self._scales, low=self._low, high=self._high
+        )
+
+    @property
+    def component_mean(self) -> jax.Array:
+        return _truncated_moments(
+            self._locs,
+            self._scales,
+            self._low,
+            self._high,
+            self._log_diff_tail_probs,
+        )[0]
+
+    @property
+    def component_variance(self) -> jax.Array:
+        return _truncated_moments(
+            self._locs,
+            self._scales,
+            self._low,
+            self._high,
+            self._log_diff_tail_probs,
+        )[1]
+
+    @property
+    def mean(self) -> jax.Array:
+        # Note: the mixture dimension is the last axis of the (D, K) component
+        # parameters, after the event dimension, so the inherited mean and variance
+        # don't apply here:
+        probs = self.mixing_distribution.probs
+        return jnp.sum(probs * self.component_mean, axis=self.mixture_dim)
+
+    @property
+    def variance(self) -> jax.Array:
+        probs = self.mixing_distribution.probs
+        mean_cond_var = jnp.sum(probs * self.component_variance, axis=self.mixture_dim)
+        sq_deviation = (
+            self.component_mean - jnp.expand_dims(self.mean, axis=self.mixture_dim)
+        ) ** 2
+        var_cond_mean = jnp.sum(probs * sq_deviation, axis=self.mixture_dim)
+        return mean_cond_var + var_cond_mean
+
+    def component_log_probs(self, value: ArrayLike) -> jax.Array:
+        return _component_log_probs(
+            self._prepare_value(value),
+            self._locs,
+            self._scales,
+            self._log_norm,
+            self.support,
         )
 
     def log_prob(self, value: ArrayLike) -> jax.Array:
-        comp_lp = self.component_log_probs(value)
-        return logsumexp(
-            jax.nn.log_softmax(self.mixing_distribution.logits)
-            + comp_lp.sum(axis=self._dim_dim),
-            axis=self.mixture_dim,
+        return _log_prob(
+            self._prepare_value(value),
+            self._locs,
+            self._scales,
+            self._log_mix_minus_tail,
+            self.support,
         )
 
     def component_sample(
@@ -123,42 +366,67 @@ class IndependentGMM(dist.MixtureSameFamily):
             sample_shape=sample_shape,  # + self.event_shape
         )
 
-    # def sample_with_intermediates(
-    #     self, key: jax.random.PRNGKey, sample_shape: tuple = ()
-    # ) -> tuple:
-    #     """
-    #     A version of ``sample`` that also returns the sampled component indices
-
-    #     Parameters
-    #     ----------
-    #     key
-    #         The rng_key key to be used for the distribution.
-    #     sample_shape
-    #         The sample shape for the distribution.
-
-    #     Returns
-    #     -------
-    #     samples
-    #         The samples from the distribution.
-    #     indices
-    #         The indices of the sampled components.
-    #     """
-    #     key_comp, key_ind = jax.random.split(key)
-    #     samples = self.component_sample(key_comp, sample_shape=sample_shape)
-
-    #     # Sample selection indices from the categorical (shape will be sample_shape)
-    #     indices = self.mixing_distribution.expand(
-    #         sample_shape + self.batch_shape
-    #     ).sample(key_ind)
-    #     indices_expanded = indices.reshape(indices.shape + (1,))
-
-    #     # Select samples according to indices samples from categorical
-    #     samples_selected = jnp.take_along_axis(
-    #         samples, indices=indices_expanded, axis=-2
-    #     )
-    #     samples_selected = jnp.squeeze(samples_selected, axis=-1)
-
-    #     return samples_selected, indices
-
-    # def sample(self, key, sample_shape=()):
-    #     return self.sample_with_intermediates(key=key, sample_shape=sample_shape)[0]
+    def sample_with_intermediates(
+        self, key: jax.Array, sample_shape: tuple = ()
+    ) -> tuple:
+        """
+        A version of ``sample`` that also returns the sampled component indices
+
+        Parameters
+        ----------
+        key
+            The rng_key key to be used for the distribution.
+        sample_shape
+            The sample shape for the distribution.
+
+        Returns
+        -------
+        samples
+            The samples from the distribution.
+        indices
+            The indices of the sampled components.
+        """
+        key_ind, key_u = jax.random.split(key)
+
+        # Sample selection indices from the categorical (shape will be sample_shape)
+        indices = self.mixing_distribution.expand(
+            sample_shape + self.batch_shape
+        ).sample(key_ind)
+
+        # Sample the truncated Normal by inverting the CDF, but only for the selected
+        # component of each sample. Like in _log_truncated_mass(), bounds that are both
+        # above the mean are reflected to use the lower tail of the Normal instead:
+        alpha = (self._low - self._locs) / self._scales
+        beta = (self._high - self._locs) / self._scales
+        flip = alpha > 0
+        a = jnp.where(flip, -beta, alpha)
+        b = jnp.where(flip, -alpha, beta)
+
+        # Gather the (D, K) arrays at the sampled components -> (*sample_shape, D)
+        loc, scale, low, high, a, b, flip = (
+            arr.T[indices]
+            for arr in (self._locs, self._scales, self._low, self._high, a, b, flip)
+        )
+
+        # Like in _precompute_components(), evaluate the CDF in (at least) single
+        # precision:
+        dtype = jnp.promote_types(loc.dtype, jnp.float32)
+        a, b = a.astype(dtype), b.astype(dtype)
+
+        u = jax.random.uniform(
+            key_u, shape=loc.shape, dtype=dtype, minval=jnp.finfo(dtype).tiny
+        )
+        z = _standard_truncated_icdf(u, a, b)
+        z = jnp.where(flip, -z, z)
+
+        # Guard against round-off pushing samples onto or just outside of the bounds
+        # (less_than and greater_than are strict inequalities):
+        samples = jnp.clip(
+            (loc + scale * z).astype(loc.dtype),
+            jnp.nextafter(low, jnp.inf),
+            jnp.nextafter(high, -jnp.inf),
+        )
+        return samples, [indices]
+
+    def sample(self, key: jax.Array, sample_shape: tuple = ()) -> jax.Array:
+        return self.sample_with_intermediates(key=key, sample_shape=sample_shape)[0]
@@ -1,9 +1,14 @@
 __all__ = ["ModelMixin", "ModelComponent", "ComponentMixtureModel"]
 
 import copy
+import inspect
+import re
 from abc import abstractmethod
 from collections import defaultdict
+from collections.abc import Callable, Mapping
+from functools import cached_property
 from itertools import chain
+from types import MappingProxyType
 from typing import Any
 
 import equinox as eqx
@@ -14,14 +19,58 @@ import numpy as np
 import numpyro
 import numpyro.distributions as dist
 from jax.typing import ArrayLike
-from jax_ext.integrate import ln_simpson
-from numpyro.handlers import seed
 
 from stream_membership.distributions import ConcatenatedDistributions
 
 from ._typing import CoordinateName
-from .plot import _plot_projections
-from .utils import get_coord_from_data_dict
+from .plot import _bin_indices, _is_uniform, _plot_projections, _residual_image
+from .utils import get_coord_from_data_dict, simpson_weights
+
+# Numpyro parameter names are of the form "component:coordinate:parameter":
+_NUMPYRO_NAME_RE = re.compile(r"^([^:]+):([^:]+):([^:]+)$")
+
+# Suffix of the batched observed sites (see ModelComponent.__call__()). These match
+# the parameter name pattern above, so _expand_numpyro_name() has to reject them:
+_OBS_BATCH_SUFFIX = "obs-batch"
+
+# Kinds of coordinate parameter specifications, used in ModelComponent._param_plan:
+_PAR_SAMPLE_KWARGS = 0  # dict of arguments to numpyro.sample()
+_PAR_SAMPLE_DIST = 1  # prior distribution passed to numpyro.sample()
+_PAR_LITERAL = 2  # fixed value
+
+
+class _LazyMesh:
+    """
+    A 2D grid defined by two 1D grids, equivalent to jnp.meshgrid(gx, gy), where the 2D
+    arrays are only materialized (and then kept) if they are accessed. This unpacks
+    like the list returned by jnp.meshgrid(), i.e. `x2d, y2d = mesh`.
+    """
+
+    def __init__(self, gx: ArrayLike, gy: ArrayLike):
+        self.gx = jnp.asarray(gx)
+        self.gy = jnp.asarray(gy)
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return (self.gy.shape[0], self.gx.shape[0])
+
+    @cached_property
+    def x2d(self) -> jax.Array:
+        return jnp.broadcast_to(self.gx[None, :], self.shape)
+
+    @cached_property
+    def y2d(self) -> jax.Array:
+        return jnp.broadcast_to(self.gy[:, None], self.shape)
+
+    def __getitem__(self, i: int) -> jax.Array:
+        return (self.x2d, self.y2d)[i]
+
+    def __iter__(self):
+        yield self.x2d
+        yield self.y2d
+
+    def __len__(self) -> int:
+        return 2
 
 
 class ModelMixin:
@@ -34,11 +83,12 @@ class ModelMixin:
         self,
         grids_1d: dict[str, ArrayLike],
         grid_coord_names: list[tuple[str, str]],
-    ) -> dict[tuple[str, str], list[jax.Array]]:
+    ) -> dict[tuple[str, str], _LazyMesh]:
         """
         Takes a dictionary of 1D grids and returns a dictionary of 2D grids for each
         pair of coordinates in grid_coord_names, which will be used to evaluate and plot
-        the model in 2D projections.
+        the model in 2D projections. The 2D grids are only materialized when accessed
+        (see _LazyMesh).
         """
         grids_2d = {}
         for name_pair in grid_coord_names:
@@ -49,7 +99,7 @@ class ModelMixin:
                         "the grids_1d argument"
                     )
                     raise ValueError(msg)
-            grids_2d[name_pair] = jnp.meshgrid(*[grids_1d[name] for name in name_pair])
+            grids_2d[name_pair] = _LazyMesh(*[grids_1d[name] for name in name_pair])
 
         return grids_2d
 
@@ -57,7 +107,7 @@ class ModelMixin:
     def evaluate_on_2d_grids(
         self, pars, grids, grid_coord_names, x_coord_name
     ) -> tuple[
-        dict[tuple[str, str], list[jax.Array]], dict[tuple[str, str], jax.Array]
+        dict[tuple[str, str], _LazyMesh], dict[tuple[str, str], jax.Array]
     ]:
         pass
 
@@ -104,7 +154,7 @@ class ModelMixin:
         pcolormesh_kwargs
             Keyword arguments to pass to the matplotlib.pcolormesh() function.
         """
-        grids, ln_ps = self.evaluate_on_2d_grids(
+        grids_2d, ln_ps = self.evaluate_on_2d_grids(
             pars=pars,
             grids=grids,
             grid_coord_names=grid_coord_names,
@@ -112,22 +162,27 @@ class ModelMixin:
         )
 
         if ndata == None:
-            ims = {k: np.exp(v) for k, v in ln_ps.items()}
+            ims = {k: jnp.exp(v) for k, v in ln_ps.items()}
 
         else:
-            # Compute the bin area for each 2D grid cell for a cheap integral...
+            # The bin area for each 2D grid cell, from the 1D grids, for a cheap
+            # integral...
             bin_area = {
-                k: np.abs(np.diff(grid1[0])[None] * np.diff(grid2[:, 0])[:, None])
-                for k, (grid1, grid2) in grids.items()
+                k: np.abs(np.diff(grids[k[0]])[None] * np.diff(grids[k[1]])[:, None])
+                for k in grids_2d
             }
 
             ln_ns = {
-                k: ln_p + np.log(ndata) + np.log(bin_area[k]) for k, ln_p in ln_ps.items()
+                k: ln_p + jnp.log(ndata) + jnp.log(bin_area[k])
+                for k, ln_p in ln_ps.items()
             }
-            ims = {k: np.exp(v) for k, v in ln_ns.items()}
+            ims = {k: jnp.exp(v) for k, v in ln_ns.items()}
+
+        # Compute the images on the device and transfer them to the host once:
+        ims = jax.device_get(ims)
 
         return _plot_projections(
-            grids=grids,
+            grids=grids_2d,
             ims=ims,
             axes=axes,
             label=label,
@@ -183,43 +238,48 @@ class ModelMixin:
             residuals. If None, no smoothing is applied.
 
         """
-        from scipy.ndimage import gaussian_filter
-
         grids_2d, ln_ps = self.evaluate_on_2d_grids(
             pars=pars,
             grids=grids,
             grid_coord_names=grid_coord_names,
             x_coord_name=x_coord_name,
         )
-        N_data = next(iter(data.values())).shape[0]
+        # All grids share the same x coordinate, which must also be in the data:
+        x_name = self.default_x_coord if x_coord_name is None else x_coord_name
+        N_data = int(data[x_name].shape[0])
 
-        # Compute the bin area for each 2D grid cell for a cheap integral...
+        # The bin area for each 2D grid cell, from the 1D grids, for a cheap integral...
         bin_area = {
-            k: np.abs(np.diff(grid1[0])[None] * np.diff(grid2[:, 0])[:, None])
-            for k, (grid1, grid2) in grids_2d.items()
+            k: np.abs(np.diff(grids[k[0]])[None] * np.diff(grids[k[1]])[:, None])
+            for k in grids_2d
         }
 
         ln_ns = {
-            k: ln_p + np.log(N_data) + np.log(bin_area[k]) for k, ln_p in ln_ps.items()
+            k: ln_p + jnp.log(N_data) + jnp.log(bin_area[k]) for k, ln_p in ln_ps.items()
         }
-        model_ims = {k: np.exp(v) for k, v in ln_ns.items()}
+        model_ims = {k: jnp.exp(v) for k, v in ln_ns.items()}
+
+        # We only need to bin the x data once:
+        ix = _bin_indices(
+            jnp.asarray(data[x_name]),
+            jnp.asarray(grids[x_name]),
+            uniform=_is_uniform(grids[x_name]),
+        )
 
         resid_ims = {}
         for name_pair, model_im in model_ims.items():
-            # get the number density: density=True is the prob density, so need to
-            # multiply back in the total number of data points
-            H_data, *_ = np.histogram2d(
-                data[name_pair[0]],
-                data[name_pair[1]],
-                bins=(grids[name_pair[0]], grids[name_pair[1]]),
+            # get the number counts of the data in each 2D grid cell:
+            iy = _bin_indices(
+                jnp.asarray(data[name_pair[1]]),
+                jnp.asarray(grids[name_pair[1]]),
+                uniform=_is_uniform(grids[name_pair[1]]),
+            )
+            resid, resid_ims[name_pair] = _residual_image(
+                model_im, ix, iy, smooth=smooth
             )
-            data_im = H_data.T
-
-            resid = model_im - data_im
-            resid_ims[name_pair] = resid
 
-            if smooth is not None:
-                resid_ims[name_pair] = gaussian_filter(resid_ims[name_pair], smooth)
+        # Everything above stays on the device, so transfer to the host once:
+        resid, resid_ims = jax.device_get((resid, resid_ims))
 
         if pcolormesh_kwargs is None:
             pcolormesh_kwargs = {}
@@ -263,6 +323,59 @@ class CoordinateMapping(dict):
         return tmp
 
 
+def _is_stackable(Distribution: Any) -> bool:
+    """
+    Whether distributions of this class can be combined by stacking their parameters
+    (see _stack_distributions()): all arguments to the class must be parameters listed
+    in arg_constraints, so that the stacked parameters fully specify the combined
+    distribution.
+    """
+    arg_names = getattr(Distribution, "arg_constraints", None)
+    if not isinstance(arg_names, dict) or not arg_names:
+        return False
+
+    try:
+        signature = inspect.signature(Distribution.__init__)
+    except (TypeError, ValueError):
+        return False
+
+    init_names = [
+        name
+        for name, par in signature.parameters.items()
+        if name not in ("self", "validate_args")
+        and par.kind not in (par.VAR_POSITIONAL, par.VAR_KEYWORD)
+    ]
+    return set(init_names) == set(arg_names)
+
+
+def _stack_distributions(dists: list[dist.Distribution]) -> dist.Distribution | None:
+    """
+    Combine a list of scalar distributions of the same (stackable, see _is_stackable())
+    family into a single distribution with event shape (len(dists),) by stacking their
+    parameters along a new last axis. The parameters are only broadcast against each
+    other, not to the data shape, and dist.Independent broadcasts them against the
+    observed values. This returns None if any of the distributions are not of the
+    same class or if any parameter has event dimensions.
+    """
+    Distribution = type(dists[0])
+    if any(type(d) is not Distribution or d.event_shape != () for d in dists):
+        return None
+
+    try:
+        pars = {}
+        for name in Distribution.arg_constraints:
+            vals = [getattr(d, name) for d in dists]
+            if any(
+                jnp.ndim(v) > len(d.batch_shape)
+                for v, d in zip(vals, dists, strict=True)
+            ):
+                return None
+            pars[name] = jnp.stack(jnp.broadcast_arrays(*vals), axis=-1)
+        return dist.Independent(Distribution(**pars), reinterpreted_batch_ndims=1)
+    except (TypeError, ValueError):
+        return None
+
+
 class ModelComponent(eqx.Module, ModelMixin):
     """
     Creating evaluating the different components of the density model.
@@ -317,6 +430,14 @@ class ModelComponent(eqx.Module, ModelMixin):
     conditional_data: dict[CoordinateName, dict[str, str]] = eqx.field(default=None)
     _coord_names: list[str] = eqx.field(init=False)
     _sample_order: list[CoordinateName] = eqx.field(init=False)
+    _cond_plan: list[tuple[CoordinateName, str, str]] = eqx.field(init=False)
+    _param_plan: list[tuple[CoordinateName, Any, list[tuple]]] = eqx.field(init=False)
+    _numpyro_names: Mapping[tuple, str] = eqx.field(
+        init=False, repr=False, static=True
+    )
+    _obs_batches: tuple[tuple[tuple[str, ...], str], ...] = eqx.field(
+        init=False, repr=False, static=True
+    )
 
     def __init__(
         self,
@@ -358,6 +479,44 @@ class ModelComponent(eqx.Module, ModelMixin):
         if self.conditional_data is None:
             self.conditional_data = {}
 
+        # Flatten the conditional data into (coord_name, key, data name) triples so
+        # _make_conditional_data() doesn't have to walk the nested dictionaries:
+        self._cond_plan = [
+            (coord_name, key, val)
+            for coord_name in self.coord_distributions
+            for key, val in self.conditional_data.get(coord_name, {}).items()
+        ]
+
+        # Cache the numpyro names of all coordinates and parameters, keyed by
+        # (coord_name, arg_name), where arg_name is None for the coordinate itself.
+        # Note: this is a static field, so it isn't flattened when the model is passed
+        # through JAX transformations, but equinox flattens the values of static fields
+        # once in __init__ to check that they don't contain arrays. A plain dict would
+        # fail there because the mixed str/tuple/None keys can't be sorted, so this is
+        # stored as a read-only view (which JAX treats as a leaf) instead:
+        numpyro_names = {}
+        for coord_name in self.coord_distributions:
+            numpyro_names[(coord_name, None)] = self._make_numpyro_name(coord_name)
+            for arg in self.coord_parameters.get(coord_name, {}):
+                numpyro_names[(coord_name, arg)] = self._make_numpyro_name(
+                    coord_name, arg
+                )
+        self._numpyro_names = MappingProxyType(numpyro_names)
+
+        # Independent coordinates whose distributions are of the same (stackable)
+        # family can be observed together as a single numpyro site (see __call__()),
+        # so group them and cache the names of the batched sites:
+        families = defaultdict(list)
+        for coord_name, Distribution in self.coord_distributions.items():
+            if isinstance(coord_name, str) and _is_stackable(Distribution):
+                families[Distribution].append(coord_name)
+        self._obs_batches = tuple(
+            (tuple(names), self._make_numpyro_name(tuple(names), _OBS_BATCH_SUFFIX))
+            for names in families.values()
+            if len(names) > 1
+        )
+        self._param_plan = self._make_param_plan()
+
         # Validate that there are no circular dependencies:
         _pairs = []
         for coord_name in self.coord_distributions:
@@ -383,6 +542,52 @@ class ModelComponent(eqx.Module, ModelMixin):
     def coord_names(self):
         return self._coord_names
 
+    def _make_param_plan(self) -> list[tuple[CoordinateName, Any, list[tuple]]]:
+        """
+        Flatten coord_distributions and coord_parameters into a list of (coordinate
+        name, distribution class, parameter specs) with one entry per coordinate, where
+        each parameter spec is a tuple of (argument name, kind, wrapper, numpyro name).
+        The kind is one of the _PAR_* constants, and the wrapper is None if the value is
+        not wrapped. This way, make_dists() doesn't have to inspect the parameter
+        specifications or format numpyro names on every call.
+
+        The values themselves are not stored in the plan (they stay in
+        coord_parameters, see _get_param_value()) so that the plan contains no array
+        leaves.
+        """
+        plan = []
+        for coord_name, Distribution in self.coord_distributions.items():
+            arg_plan = []
+            for arg, val in self.coord_parameters.get(coord_name, {}).items():
+                # Note: passing in a tuple as a value is a way to wrap the value in a
+                # function or outer distribution, for example for a mixture model
+                if isinstance(val, tuple) and callable(val[0]):
+                    wrapper, val = val  # noqa: PLW2901
+                else:
+                    wrapper = None
+
+                if isinstance(val, dict):
+                    kind = _PAR_SAMPLE_KWARGS
+                elif isinstance(val, dist.Distribution):
+                    kind = _PAR_SAMPLE_DIST
+                else:
+                    kind = _PAR_LITERAL
+
+                arg_plan.append(
+                    (arg, kind, wrapper, self._numpyro_names[(coord_name, arg)])
+                )
+            plan.append((coord_name, Distribution, arg_plan))
+        return plan
+
+    def _get_param_value(
+        self, coord_name: CoordinateName, arg: str, wrapper: Callable | None
+    ) -> Any:
+        """
+        Get the (unwrapped) specification of a parameter from coord_parameters.
+        """
+        val = self.coord_parameters[coord_name][arg]
+        return val if wrapper is None else val[1]
+
     def _make_numpyro_name(
         self, coord_name: CoordinateName, arg_name: str | None = None
     ) -> str:
@@ -421,11 +626,20 @@ class ModelComponent(eqx.Module, ModelMixin):
             "background", the coordinate is named "phi2", and the parameter is named
             "loc".
         """
-        bits = numpyro_name.split(":")
+        match = _NUMPYRO_NAME_RE.match(numpyro_name)
+        if match is None:
+            msg = f"Invalid numpyro parameter name '{numpyro_name}'"
+            raise ValueError(msg)
+
+        name, coord_name, arg_name = match.groups()
+        if arg_name == _OBS_BATCH_SUFFIX:
+            msg = f"'{numpyro_name}' is an observed site, not a parameter"
+            raise ValueError(msg)
+
         return (
-            bits[0],
-            tuple(bits[1].split("-")) if "-" in bits[1] else bits[1],
-            bits[2],
+            name,
+            tuple(coord_name.split("-")) if "-" in coord_name else coord_name,
+            arg_name,
         )
 
     def pack_params(self, pars: dict[CoordinateName, Any]) -> dict[str, Any]:
@@ -477,7 +691,7 @@ class ModelComponent(eqx.Module, ModelMixin):
                 expanded_pars[name][coord_name] = {}
             expanded_pars[name][coord_name][arg_name] = v
 
-        return expanded_pars[name]
+        return expanded_pars.get(self.name, {})
 
     def make_dists(
         self,
@@ -506,51 +720,141 @@ class ModelComponent(eqx.Module, ModelMixin):
         pars = pars if pars is not None else {}
         dists = dists if dists is not None else {}
 
-        for coord_name, Distribution in self.coord_distributions.items():
-            kwargs = {}
-
+        for coord_name, Distribution, arg_plan in self._param_plan:
             if coord_name in dists:
                 continue
 
-            for arg, val in self.coord_parameters.get(coord_name, {}).items():
-                numpyro_name = self._make_numpyro_name(coord_name, arg)
-
-                # Note: passing in a tuple as a value is a way to wrap the value in a
-                # function or outer distribution, for example for a mixture model
-                if isinstance(val, tuple) and callable(val[0]):
-                    wrapper, val = val  # noqa: PLW2901
-                else:
-                    wrapper = lambda x: x  # noqa: E731
-
-                if arg in pars.get(coord_name, {}):
+            coord_pars = pars.get(coord_name, {})
+            kwargs = {}
+            for arg, kind, wrapper, numpyro_name in arg_plan:
+                if arg in coord_pars:
                     # If an argument is passed in the pars dictionary, use that value.
                     # This is useful, for example, for constructing the coordinate
                     # distributions once a model is optimized or sampled, so you can
                     # pass in parameter values to evaluate the model.
-                    par = pars[coord_name][arg]
-                elif isinstance(val, dict):
+                    par = coord_pars[arg]
+                    kwargs[arg] = par if wrapper is None else wrapper(par)
+                    continue
+
+                val = self._get_param_value(coord_name, arg, wrapper)
+                if kind == _PAR_SAMPLE_KWARGS:
                     par = numpyro.sample(numpyro_name, **val)
-                elif isinstance(val, dist.Distribution):
+                elif kind == _PAR_SAMPLE_DIST:
                     par = numpyro.sample(numpyro_name, val)
                 else:
                     par = val
-                kwargs[arg] = wrapper(par)
+                kwargs[arg] = par if wrapper is None else wrapper(par)
 
             dists[coord_name] = Distribution(**kwargs)
 
         return {k: dists[k] for k in self.coord_distributions}
 
+    def _get_priors(
+        self,
+        pars: dict[CoordinateName, Any] | None = None,
+        dists: dict[CoordinateName, dist.Distribution] | None = None,
+    ) -> list[tuple[CoordinateName, str, int, Any]]:
+        """
+        Find all parameters that need to be drawn from their priors, i.e. those that are
+        not fixed values, not passed in via `pars`, and not for a coordinate with a
+        pre-constructed distribution in `dists`. This returns a list of (coordinate
+        name, argument name, kind, value) tuples, where kind is one of the _PAR_*
+        constants.
+        """
+        pars = pars if pars is not None else {}
+        dists = dists if dists is not None else {}
+        return [
+            (coord_name, arg, kind, self._get_param_value(coord_name, arg, wrapper))
+            for coord_name, _, arg_plan in self._param_plan
+            if coord_name not in dists
+            for arg, kind, wrapper, _ in arg_plan
+            if kind != _PAR_LITERAL and arg not in pars.get(coord_name, {})
+        ]
+
+    def _make_dists_from_key(
+        self,
+        key: jax.Array,
+        pars: dict[CoordinateName, Any] | None = None,
+        dists: dict[CoordinateName, dist.Distribution] | None = None,
+    ) -> dict[CoordinateName, dist.Distribution]:
+        """
+        Make a dictionary of distributions for each coordinate in the component, where
+        any parameters not passed in via `pars` are drawn from their prior distributions
+        using the input random key. This is equivalent to calling make_dists() with a
+        seed handler, but draws from the priors directly instead of going through
+        numpyro.sample() (unless a parameter is specified with numpyro.sample()
+        arguments other than "fn", "sample_shape", and "obs").
+
+        Parameters
+        ----------
+        key
+            A JAX random key.
+        pars (optional)
+            A dictionary of parameters, structured as for make_dists().
+        dists (optional)
+            A dictionary of pre-constructed distributions to use for some coordinates.
+        """
+        pars = pars if pars is not None else {}
+        dists = dists if dists is not None else {}
+        priors = self._get_priors(pars=pars, dists=dists)
+
+        # Only these arguments to numpyro.sample() are handled when drawing directly
+        # from the priors. Other specifications go through numpyro.sample() instead:
+        if any(
+            kind == _PAR_SAMPLE_KWARGS
+            and not set(val) <= {"fn", "sample_shape", "obs"}
+            for _, _, kind, val in priors
+        ):
+            return numpyro.handlers.seed(self.make_dists, key)(pars=pars, dists=dists)
+
+        all_pars = {k: dict(v) for k, v in pars.items()}
+        keys = jax.random.split(key, max(len(priors), 1))
+        for (coord_name, arg, kind, val), key_ in zip(priors, keys, strict=False):
+            if kind == _PAR_SAMPLE_KWARGS:
+                # Arguments to numpyro.sample(), e.g., {"fn": ..., "sample_shape": ...}
+                if val.get("obs") is not None:
+                    par = val["obs"]
+                else:
+                    par = val["fn"].sample(
+                        key_, sample_shape=val.get("sample_shape", ())
+                    )
+            else:
+                par = val.sample(key_)
+            all_pars.setdefault(coord_name, {})[arg] = par
+
+        return self.make_dists(pars=all_pars, dists=dists)
+
+    def _fill_literal_pars(
+        self, pars: dict[CoordinateName, Any]
+    ) -> dict[CoordinateName, dict[str, Any]]:
+        """
+        Return a copy of the input parameters where any fixed (i.e. not sampled)
+        values from coord_parameters are filled in. This makes the parameters a complete
+        specification of the component distributions, which is needed when evaluating
+        one component's distributions with another component's parameters (e.g., when
+        batching over components in a mixture model).
+        """
+        full_pars = CoordinateMapping()
+        for coord_name, _, arg_plan in self._param_plan:
+            full_pars[coord_name] = {}
+            for arg, kind, wrapper, _ in arg_plan:
+                if arg in pars.get(coord_name, {}):
+                    full_pars[coord_name][arg] = pars[coord_name][arg]
+                elif kind == _PAR_LITERAL:
+                    full_pars[coord_name][arg] = self._get_param_value(
+                        coord_name, arg, wrapper
+                    )
+        return full_pars
+
     def _make_conditional_data(
         self, data: dict[str, ArrayLike]
     ) -> dict[CoordinateName, dict]:
-        conditional_data: dict[CoordinateName, dict] = {}
-        for coord_name in self.coord_distributions:
-            data_map = self.conditional_data.get(coord_name, {})
-
-            conditional_data[coord_name] = {}
-            for key, val in data_map.items():
-                # NOTE: behavior - if key is missing from data, we pass None
-                conditional_data[coord_name][key] = get_coord_from_data_dict(val, data)
+        conditional_data: dict[CoordinateName, dict] = {
+            coord_name: {} for coord_name in self.coord_distributions
+        }
+        for coord_name, key, val in self._cond_plan:
+            # NOTE: behavior - if key is missing from data, we pass None
+            conditional_data[coord_name][key] = get_coord_from_data_dict(val, data)
 
         return conditional_data
 
@@ -587,24 +891,66 @@ class ModelComponent(eqx.Module, ModelMixin):
         return sample_order
 
     def __call__(
-        self, data: dict[str, ArrayLike], err: dict[str, ArrayLike] | None = None
+        self,
+        data: dict[str, ArrayLike],
+        err: dict[str, ArrayLike] | None = None,
+        batch_obs: bool = True,
     ) -> None:
         """
         This sets up the model component in numpyro.
+
+        Parameters
+        ----------
+        data
+            A dictionary of data arrays, where the keys are the names of the coordinates
+            in the model component.
+        err (optional)
+            A dictionary of uncertainties for the data, with the same keys as the data.
+        batch_obs (optional)
+            If True, independent coordinates whose distributions are of the same family
+            are observed together as a single numpyro site (if none of them have errors
+            and their data have the same shape), named with the suffix
+            ``":obs-batch"`` (e.g., ``"stream:phi2-pm1:obs-batch"``), instead of one
+            ``"-obs"`` site per coordinate. The total log-likelihood is the same, but
+            the per-coordinate observed sites are then not in the trace (so, e.g.,
+            per-coordinate log-likelihoods are not available). Set this to False to
+            keep one observed site per coordinate. Default is True.
         """
         if err is None:
             err = {}
 
         dists = self.make_dists()
+
+        # Independent coordinates whose distributions are of the same family are
+        # observed together as a single numpyro site, if none of them have errors:
+        batched = set()
+        for coord_names, numpyro_name in self._obs_batches if batch_obs else ():
+            if any(err.get(k) is not None for k in coord_names):
+                continue
+
+            _datas = [jnp.asarray(data[k]) for k in coord_names]
+            if any(_data.shape != _datas[0].shape for _data in _datas):
+                continue
+
+            batch_dist = _stack_distributions([dists[k] for k in coord_names])
+            if batch_dist is None:
+                continue
+
+            numpyro.sample(numpyro_name, batch_dist, obs=jnp.stack(_datas, axis=-1))
+            batched.update(coord_names)
+
         for coord_name, dist_ in dists.items():
+            if coord_name in batched:
+                continue
+
             if isinstance(coord_name, tuple):
                 _data = jnp.stack([data[k] for k in coord_name], axis=-1)
                 _data_err = None  # TODO: we don't support errors for joint coordinates
             else:
                 _data = jnp.asarray(data[coord_name])
-                _data_err = err.get(coord_name, None)
+                _data_err = err.get(coord_name)
 
-            numpyro_name = self._make_numpyro_name(coord_name)
+            numpyro_name = self._numpyro_names[(coord_name, None)]
             if _data_err is not None:
                 sample_shape = (_data.shape[0],) if dist_.batch_shape == () else ()
                 model_val = numpyro.sample(
@@ -646,8 +992,11 @@ class ModelComponent(eqx.Module, ModelMixin):
         pars (optional)
             A dictionary of parameters for the model component.
         """
-        if pars is None:
-            dists_ = seed(self.make_dists, key)(dists=dists)
+        # Only split off a key for the parameters if there are priors to draw from, so
+        # that components with fixed parameters are sampled as before:
+        if pars is None and self._get_priors(dists=dists):
+            pars_key, key = jax.random.split(key)
+            dists_ = self._make_dists_from_key(pars_key, dists=dists)
         else:
             dists_ = self.make_dists(pars=pars, dists=dists)
 
@@ -663,37 +1012,17 @@ class ModelComponent(eqx.Module, ModelMixin):
 
         return {k: samples[k] for k in self.coord_distributions}
 
-    def evaluate_on_2d_grids(
+    def _make_grid_plan(
         self,
-        pars: dict[str, Any],
-        grids: dict[str, ArrayLike],
         grid_coord_names: list[tuple[str, str]] | None = None,
         x_coord_name: str | None = None,
-        dists: dict[CoordinateName, dist.Distribution] | None = None,
-    ):
+    ) -> tuple[str, tuple[str, str] | None, tuple[tuple[tuple[str, str], bool], ...]]:
         """
-        Evaluate the log-density of the model on 2D grids of coordinates paired with the
-        same x coordinate. For example, in the context of a stream model, the x
-        coordinate would likely be the "phi1" coordinate.
-
-        Parameters
-        ----------
-        pars
-            A dictionary of parameter values for the model component.
-        grids
-            A dictionary of 1D grids for each coordinate in the model component. The
-            keys should be the names of the coordinates you want to evaluate the model
-            on, and must always contain the x coordinate.
-        grid_coord_names
-            A list of tuples of coordinate names to evaluate the model on. The default
-            is to pair the x coordinate with each other coordinate in the model
-            component. For example, if the model component has coordinates "phi1",
-            "phi2", and "pm1", the default grid_coord_names would be [("phi1", "phi2"),
-            ("phi1", "pm1")].
-        x_coord_name
-            The name of the x coordinate to use for evaluating the model. If None, the
-            default x coordinate will be used, which is taken to be the 0th coordinate
-            name in the specified "coord_distributions".
+        Validate the requested 2D projections and work out the static evaluation
+        schedule: the x coordinate, the joint (if any) that the x coordinate belongs
+        to, and whether each coordinate pair is a joint or an independent pairing with
+        the x coordinate. The returned plan is hashable so it can be used to cache the
+        compiled evaluation function.
         """
         x_coord_name = self.default_x_coord if x_coord_name is None else x_coord_name
 
@@ -724,70 +1053,147 @@ class ModelComponent(eqx.Module, ModelMixin):
                     msg = f"{name} is not a valid coordinate name"
                     raise ValueError(msg)
 
-        grids_2d = self._get_grids_2d(grids, grid_coord_names)
+        # If the model component for the x coordinate is in a joint distribution with
+        # another coordinate, we need to evaluate the joint distribution on the grid and
+        # compute the marginal distribution for x:
+        x_joint_name_pair = None
+        if x_coord_name not in self.coord_distributions:
+            # At this point, x_coord_name is definitely a valid coord name, but it
+            # doesn't exist as a string key in coord_distributions - it must be in a
+            # joint:
+            for coord_name in self.coord_distributions:
+                if isinstance(coord_name, tuple) and x_coord_name in coord_name:
+                    x_joint_name_pair = coord_name
+                    break
+
+        pairs = tuple(
+            (tuple(name_pair), tuple(name_pair) in self.coord_distributions)
+            for name_pair in grid_coord_names
+        )
+        return x_coord_name, x_joint_name_pair, pairs
 
-        # Extra data to pass to log_prob() for each coordinate:
+    def _eval_numeric(
+        self,
+        plan: tuple,
+        pars: dict[CoordinateName, Any],
+        grids: dict[str, ArrayLike],
+        dists: dict[CoordinateName, dist.Distribution] | None = None,
+    ) -> dict[tuple[str, str], jax.Array]:
+        """
+        The numeric core of evaluate_on_2d_grids(): this only touches JAX arrays, so it
+        can be compiled with JIT. See _make_grid_plan() for the structure of `plan`.
+
+        The grid centers are computed here from the 1D grid edges, once per call, so
+        that they are part of the compiled function: the 2D grid centers are built from
+        the 1D centers instead of from 2D grids of the edges.
+        """
+        x_coord_name, x_joint_name_pair, pairs = plan
+
+        # grid edges passed in, but we evaluate at grid centers:
         grid_cs = {k: 0.5 * (grids[k][:-1] + grids[k][1:]) for k in grids}
+
+        # Only the joint distributions need the 2D grid centers:
+        grid_cs_2d = {
+            name_pair: jnp.meshgrid(*[grid_cs[name] for name in name_pair])
+            for name_pair in {x_joint_name_pair, *(p for p, joint in pairs if joint)}
+            if name_pair is not None
+        }
+
+        # Extra data to pass to log_prob() for each coordinate:
         conditional_data = self._make_conditional_data(grid_cs)
 
         # Make the distributions for each coordinate:
         dists = self.make_dists(pars=pars, dists=dists)
 
-        # First we have to check if the model component for the x coordinate is in a
-        # joint distribution with another coordinate. If it is, we need to evaluate the
-        # joint distribution on the grid and compute the marginal distribution for x:
-        if x_coord_name not in self.coord_distributions:
-            # At this point, x_coord_name is definitely a valid coord name, but it
-            # doesn't exist as a string key in coord_distributions - it must be in a
-            # joint:
-            for x_joint_name_pair in self.coord_distributions:
-                if x_coord_name in x_joint_name_pair:
-                    break
-
+        if x_joint_name_pair is not None:
             # Evaluate the joint distribution on the grids:
-            grid1, grid2 = grids_2d[x_joint_name_pair]
-            grid1_c = 0.5 * (grid1[:-1, :-1] + grid1[1:, 1:])
-            grid2_c = 0.5 * (grid2[:-1, :-1] + grid2[1:, 1:])
-
+            grid1_c, grid2_c = grid_cs_2d[x_joint_name_pair]
             ln_p = dists[x_joint_name_pair].log_prob(
                 jnp.stack((grid1_c, grid2_c), axis=-1),
                 **conditional_data[x_joint_name_pair],
             )
 
             # Integrates over the other coordinate to get the marginal distribution for
-            # x:
-            ln_p_x = ln_simpson(ln_p, grid2_c, axis=0)
-            x_grid = grid1_c
+            # x, with the Simpson's rule weights folded into the log-sum (as the scale
+            # factors, since the weights can be negative for non-uniform grids):
+            w = simpson_weights(grid_cs[x_joint_name_pair[1]])
+            ln_p_x = jax.scipy.special.logsumexp(ln_p, axis=0, b=w[:, None])
 
         else:
             # Otherwise, we can just evaluate the model on the x coordinate grid:
-            grid = grids[x_coord_name]
-            x_grid = 0.5 * (grid[:-1] + grid[1:])
             ln_p_x = dists[x_coord_name].log_prob(
-                x_grid, **conditional_data[x_coord_name]
+                grid_cs[x_coord_name], **conditional_data[x_coord_name]
             )
 
         evals = {}
-        for name_pair in grid_coord_names:
-            grid1, grid2 = grids_2d[name_pair]
-
-            # grid edges passed in, but we evaluate at grid centers:
-            grid1_c = 0.5 * (grid1[:-1, :-1] + grid1[1:, 1:])
-            grid2_c = 0.5 * (grid2[:-1, :-1] + grid2[1:, 1:])
-
+        for name_pair, is_joint in pairs:
             # Evaluate the model on the grid
-            if name_pair in self.coord_distributions:
-                # It's a joint distribution:
+            if is_joint:
+                grid1_c, grid2_c = grid_cs_2d[name_pair]
                 evals[name_pair] = dists[name_pair].log_prob(
                     jnp.stack((grid1_c, grid2_c), axis=-1),
                     **conditional_data[name_pair],
                 )
             else:
-                # It's an independent distribution from the x_coord_name:
+                # It's an independent distribution from the x_coord_name, so we only
+                # need the 1D y grid centers and can broadcast against the x axis:
                 ln_p_y = dists[name_pair[1]].log_prob(
-                    grid2_c, **conditional_data[name_pair[1]]
+                    grid_cs[name_pair[1]][:, None], **conditional_data[name_pair[1]]
                 )
-                evals[name_pair] = ln_p_x + ln_p_y
+                evals[name_pair] = ln_p_x[None, :] + ln_p_y
+
+        return evals
+
+    def evaluate_on_2d_grids(
+        self,
+        pars: dict[str, Any],
+        grids: dict[str, ArrayLike],
+        grid_coord_names: list[tuple[str, str]] | None = None,
+        x_coord_name: str | None = None,
+        dists: dict[CoordinateName, dist.Distribution] | None = None,
+    ):
+        """
+        Evaluate the log-density of the model on 2D grids of coordinates paired with the
+        same x coordinate. For example, in the context of a stream model, the x
+        coordinate would likely be the "phi1" coordinate.
+
+        Parameters
+        ----------
+        pars
+            A dictionary of parameter values for the model component.
+        grids
+            A dictionary of 1D grids for each coordinate in the model component. The
+            keys should be the names of the coordinates you want to evaluate the model
+            on, and must always contain the x coordinate.
+        grid_coord_names
+            A list of tuples of coordinate names to evaluate the model on. The default
+            is to pair the x coordinate with each other coordinate in the model
+            component. For example, if the model component has coordinates "phi1",
+            "phi2", and "pm1", the default grid_coord_names would be [("phi1", "phi2"),
+            ("phi1", "pm1")].
+        x_coord_name
+            The name of the x coordinate to use for evaluating the model. If None, the
+            default x coordinate will be used, which is taken to be the 0th coordinate
+            name in the specified "coord_distributions".
+        dists
+            A dictionary of pre-constructed distributions to use for some coordinates,
+            for example for tied coordinates in a mixture model.
+        """
+        plan = self._make_grid_plan(grid_coord_names, x_coord_name)
+        grids_2d = self._get_grids_2d(grids, [name_pair for name_pair, _ in plan[2]])
+
+        grids = {k: jnp.asarray(v) for k, v in grids.items()}
+        if dists:
+            # NOTE: distribution instances do not (in general) survive being flattened
+            # and unflattened by JAX, so we can't pass them through the compiled
+            # function and instead evaluate eagerly:
+            evals = self._eval_numeric(plan, pars, grids, dists=dists)
+        else:
+            # Float parameter values are converted to arrays so that they are traced
+            # instead of static, and new values don't trigger a recompile:
+            evals = _eval_component_on_grids(
+                self, plan, _floats_to_arrays(CoordinateMapping(pars)), grids
+            )
 
         return grids_2d, evals
 
@@ -802,6 +1208,51 @@ class ModelComponent(eqx.Module, ModelMixin):
         return 0.0
 
 
+def _floats_to_arrays(tree: Any) -> Any:
+    """
+    Convert any Python or NumPy float leaves of a pytree to JAX arrays, so that they
+    are traced by eqx.filter_jit() and jax.vmap() instead of being treated as static.
+    """
+    return jax.tree_util.tree_map(
+        lambda x: jnp.asarray(x) if isinstance(x, float | np.floating) else x, tree
+    )
+
+
+@eqx.filter_jit
+def _eval_component_on_grids(
+    component: ModelComponent,
+    plan: tuple,
+    pars: dict[CoordinateName, Any],
+    grids: dict[str, jax.Array],
+) -> dict[tuple[str, str], jax.Array]:
+    """
+    JIT-compiled version of ModelComponent._eval_numeric(). The component is passed in
+    as an argument (rather than closed over), so the compiled function is keyed on the
+    structure and static values of the component and any model built from it (e.g., with
+    eqx.tree_at) is evaluated with its own values. The plan is static.
+    """
+    return component._eval_numeric(plan, pars, grids)
+
+
+@eqx.filter_jit
+def _eval_components_batched(
+    component: ModelComponent,
+    plan: tuple,
+    stacked_pars: dict[CoordinateName, Any],
+    static_pars: dict[CoordinateName, Any],
+    grids: dict[str, jax.Array],
+) -> dict[tuple[str, str], jax.Array]:
+    """
+    Evaluate all (homogeneous) components of a mixture on the grids with a single
+    vmapped call to one component's evaluator, where the parameters of the components
+    are stacked along the leading axis (see
+    ComponentMixtureModel._stack_component_pars()).
+    """
+    return jax.vmap(
+        lambda p: component._eval_numeric(plan, eqx.combine(p, static_pars), grids)
+    )(stacked_pars)
+
+
 class ComponentMixtureModel(eqx.Module, ModelMixin):
     """
     Creating a mixture model from multiple ModelComponent objects.
@@ -847,6 +1298,7 @@ class ComponentMixtureModel(eqx.Module, ModelMixin):
     coord_names: tuple[str] = eqx.field(init=False)
     _tied_order: list[str] = eqx.field(init=False)
     _components: dict[str, ModelComponent] = eqx.field(init=False)
+    _homogeneous: bool = eqx.field(init=False, repr=False)
 
     def __post_init__(self):
         # Some validation of the input bits:
@@ -906,10 +1358,49 @@ class ComponentMixtureModel(eqx.Module, ModelMixin):
         # for:
         self._tied_order = self._make_tied_order(self.tied_coordinates)
 
+        # If all components have the same structure (same distribution classes, fixed
+        # parameter wrappers, and conditional data) and no coordinates are tied, the
+        # components can be evaluated in a single batch with one component's evaluator:
+        self._homogeneous = not self.tied_coordinates and all(
+            self._same_structure(self.components[0], component)
+            for component in self.components[1:]
+        )
+
     @property
     def component_names(self) -> tuple[str, ...]:
         return tuple(self._components.keys())
 
+    @property
+    def default_x_coord(self) -> str:
+        # The components are evaluated with the default x coordinate of the first one
+        return self.components[0].default_x_coord
+
+    @staticmethod
+    def _same_structure(component1: ModelComponent, component2: ModelComponent) -> bool:
+        """
+        Check whether two model components can be evaluated with the same evaluator,
+        i.e. whether they differ only in their parameter values.
+        """
+
+        def _wrappers(component):
+            return {
+                (coord_name, arg): val[0]
+                for coord_name, coord_pars in component.coord_parameters.items()
+                for arg, val in coord_pars.items()
+                if isinstance(val, tuple) and callable(val[0])
+            }
+
+        return (
+            type(component1) is type(component2)
+            and component1.default_x_coord == component2.default_x_coord
+            and list(component1.coord_distributions.items())
+            == list(component2.coord_distributions.items())
+            and {k: set(v) for k, v in component1.coord_parameters.items()}
+            == {k: set(v) for k, v in component2.coord_parameters.items()}
+            and component1.conditional_data == component2.conditional_data
+            and _wrappers(component1) == _wrappers(component2)
+        )
+
     def _make_tied_order(
         self, tied_coordinates: dict[str, dict[str, str]]
     ) -> list[str]:
@@ -1014,7 +1505,7 @@ class ComponentMixtureModel(eqx.Module, ModelMixin):
             #        Do we need to have errors for all coordinates???
             # NOTE: we should warn the user that this is happening...
             # err = {k: err.get(k, jnp.full(stacked_data.shape[0], 1e-8)) for k in data}
-            err = {k: err.get(k, 1e-4) for k in data}
+            err = {k: err.get(k, 1e-4) for k in self.coord_names}
             sample_shape = (stacked_data.shape[0],) if mixture.batch_shape == () else ()
             model_data = numpyro.sample("mixture:modeldata", mixture, sample_shape=sample_shape)
 
@@ -1031,13 +1522,19 @@ class ComponentMixtureModel(eqx.Module, ModelMixin):
                 size = 2 if isinstance(name, tuple) else 1
                 slc = slice(i, i + size)
 
+                # Note: the observed values are the input data arrays themselves, so we
+                # don't need to slice them back out of stacked_data:
                 with numpyro.plate('data', stacked_data.shape[0]):
                     if size == 1:
                         model_data_dist = dist.Normal(jnp.squeeze(model_data[:, slc]), err[name])
-                        numpyro.sample(f"{name}-obs", model_data_dist, obs=jnp.squeeze(stacked_data[:, slc]))
+                        numpyro.sample(f"{name}-obs", model_data_dist, obs=jnp.asarray(data[name]))
                     elif size == 2:
                         model_data_dist = dist.Normal(model_data[:, slc], err[name])
-                        numpyro.sample(f"{name}-obs", model_data_dist, obs=stacked_data[:, slc])
+                        numpyro.sample(
+                            f"{name}-obs",
+                            model_data_dist,
+                            obs=jnp.stack([data[k] for k in name], axis=-1),
+                        )
                 i += size
 
     def pack_params(
@@ -1074,18 +1571,26 @@ class ComponentMixtureModel(eqx.Module, ModelMixin):
             A dictionary of numpyro parameters where the keys are the names of the
             parameters created with numpyro.sample().
         """
-        pars = copy.deepcopy(pars)
+        # Sort the parameters by component in a single pass, using the component name
+        # prefix of each numpyro name; anything else (e.g., "mixture-probs") is passed
+        # through as is:
+        all_component_pars: dict[str, dict[str, Any]] = {
+            name: {} for name in self.component_names
+        }
+        remaining = {}
+        for key, val in pars.items():
+            prefix, sep, _ = key.partition(":")
+            if sep and prefix in all_component_pars:
+                all_component_pars[prefix][key] = val
+            else:
+                remaining[key] = val
 
         expanded_pars: dict[str, dict] = {}
         for component_name in self._tied_order:
             component = self._components[component_name]
             tied_map = self.tied_coordinates.get(component.name, {})
-            component_pars = {}
-            for key in list(pars.keys()):  # convert to list because we change dict keys
-                if key.startswith(f"{component.name}:"):
-                    component_pars[key] = pars.pop(key)
             expanded_pars[component.name] = component.expand_numpyro_params(
-                component_pars, skip_invalid=skip_invalid
+                all_component_pars[component.name], skip_invalid=skip_invalid
             )
 
             # TODO(adrn): duplicated code
@@ -1099,9 +1604,52 @@ class ComponentMixtureModel(eqx.Module, ModelMixin):
                     expanded_pars[dep][override_coord]
                 )
 
-        expanded_pars.update(pars)
+        expanded_pars.update(remaining)
         return expanded_pars
 
+    def _stack_component_pars(
+        self, expanded_pars: dict[str, dict[CoordinateName, Any]]
+    ) -> tuple[Any, Any] | None:
+        """
+        Stack the (array) parameters of all components along a new leading axis with
+        length equal to the number of components, so a single component evaluator can
+        be vmapped over the components. This returns the stacked array parameters and
+        the non-array parameters shared by all components, or None if the components
+        can't be batched. Python and NumPy float parameter values are converted to
+        arrays so they can differ between components, but any other non-array values
+        (e.g., integers or strings) must be equal for all components, and the array
+        shapes must match.
+        """
+        dynamic = []
+        static = None
+        for component in self.components:
+            full_pars = _floats_to_arrays(
+                component._fill_literal_pars(expanded_pars[component.name])
+            )
+            dyn, stat = eqx.partition(full_pars, eqx.is_array)
+
+            if static is None:
+                static = stat
+            elif eqx.tree_equal(static, stat) is not True:
+                return None
+
+            shapes = jax.tree_util.tree_map(jnp.shape, dyn)
+            if dynamic and shapes != jax.tree_util.tree_map(jnp.shape, dynamic[0]):
+                return None
+            dynamic.append(dyn)
+
+        stacked = jax.tree_util.tree_map(lambda *xs: jnp.stack(xs, axis=0), *dynamic)
+        return stacked, static
+
+    @staticmethod
+    def _mix_component_terms(stacked: jax.Array, probs: ArrayLike) -> jax.Array:
+        """
+        Combine per-component log-densities, stacked along the leading axis, into the
+        mixture log-density by weighting with the mixture probabilities.
+        """
+        b = jnp.reshape(probs, (-1,) + (1,) * (stacked.ndim - 1))
+        return jax.scipy.special.logsumexp(stacked, axis=0, b=b)
+
     def evaluate_on_2d_grids(
         self,
         pars: dict[str, Any],
@@ -1115,6 +1663,23 @@ class ComponentMixtureModel(eqx.Module, ModelMixin):
         else:
             expanded_pars = self.expand_numpyro_params(pars)
 
+        stacked = self._stack_component_pars(expanded_pars) if self._homogeneous else None
+        if stacked is not None:
+            # All components share a structure, so evaluate them in one batch:
+            component = self.components[0]
+            plan = component._make_grid_plan(grid_coord_names, x_coord_name)
+            all_grids = component._get_grids_2d(
+                grids, [name_pair for name_pair, _ in plan[2]]
+            )
+            batched_terms = _eval_components_batched(
+                component, plan, *stacked, {k: jnp.asarray(v) for k, v in grids.items()}
+            )
+            terms = {
+                k: self._mix_component_terms(v, pars["mixture-probs"])
+                for k, v in batched_terms.items()
+            }
+            return all_grids, terms
+
         # Deal with tied coordinates here across components:
         # TODO(adrn): duplicated code
         component_dists: dict[str, dict[CoordinateName, dist.Distribution]] = {}
@@ -1134,8 +1699,12 @@ class ComponentMixtureModel(eqx.Module, ModelMixin):
                 dists=dists.get(component_name, {}),
             )
 
-        terms: dict[str, list[jax.Array]] = {}
-        for component in self.components:
+        # The components can't be batched here, so accumulate the weighted mixture
+        # log-density one component at a time instead of stacking all of the
+        # per-component terms:
+        ln_probs = jnp.log(jnp.asarray(pars["mixture-probs"]))
+        terms: dict[str, jax.Array] = {}
+        for i, component in enumerate(self.components):
             # TODO: need to override dists here too, but damn that interface sucks
             all_grids, component_terms = component.evaluate_on_2d_grids(
                 pars=expanded_pars[component.name],
@@ -1145,15 +1714,7 @@ class ComponentMixtureModel(eqx.Module, ModelMixin):
                 dists=dists.get(component.name, {}),
             )
             for k, v in component_terms.items():
-                if k not in terms:
-                    terms[k] = []
-                terms[k].append(v)
-
-        # use "mixture-probs" to weight the component terms
-        terms = {
-            k: jax.scipy.special.logsumexp(
-                jnp.array(v).T, axis=-1, b=pars["mixture-probs"]
-            ).T
-            for k, v in terms.items()
-        }
+                ln_term = ln_probs[i] + v
+                terms[k] = jnp.logaddexp(terms[k], ln_term) if k in terms else ln_term
+
         return all_grids, terms
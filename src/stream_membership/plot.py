@@ -1,4 +1,92 @@
+from functools import partial
+
+import jax
+import jax.numpy as jnp
 import numpy as np
+from jax.typing import ArrayLike
+
+
+def _is_uniform(edges: ArrayLike) -> bool:
+    """Check whether a set of bin edges are (close to) uniformly spaced."""
+    edges = np.asarray(edges)
+    return len(edges) > 1 and np.allclose(np.diff(edges), edges[1] - edges[0])
+
+
+@partial(jax.jit, static_argnames=("uniform",))
+def _bin_indices(
+    values: jax.Array, edges: jax.Array, uniform: bool = False
+) -> jax.Array:
+    """
+    Find the index of the bin that each value falls in, given sorted bin edges. This
+    follows the convention of np.histogram(): bins are half-open, except for the last
+    bin, which also includes its right edge. Values outside of the bins are assigned an
+    index one past the last bin.
+
+    If the bins are uniformly spaced (see _is_uniform()), pass uniform=True to compute
+    the indices directly from the bin width instead of with a binary search.
+    """
+    n_bins = edges.shape[0] - 1
+
+    if uniform:
+        norm = n_bins / (edges[-1] - edges[0])
+        idx = jnp.floor((values - edges[0]) * norm).astype(jnp.int32)
+        idx = jnp.clip(idx, 0, n_bins - 1)
+
+        # Correct for round-off in computing the indices, as np.histogram() does:
+        idx = idx - (values < edges[idx])
+        idx = idx + ((values >= edges[idx + 1]) & (idx != n_bins - 1))
+
+        inside = (values >= edges[0]) & (values <= edges[-1])
+        return jnp.where(inside, idx, n_bins)
+
+    idx = jnp.searchsorted(edges, values, side="right") - 1
+    idx = jnp.where(values == edges[-1], n_bins - 1, idx)
+    return jnp.where((idx >= 0) & (idx < n_bins), idx, n_bins)
+
+
+@partial(jax.jit, static_argnames=("shape",))
+def _count_2d(ix: jax.Array, iy: jax.Array, shape: tuple[int, int]) -> jax.Array:
+    """
+    Count the number of data points in each cell of a 2D grid with the given shape
+    (ny, nx), given the bin indices along the x and y axes (see _bin_indices()). Points
+    outside of the grid are dropped.
+    """
+    return jnp.zeros(shape, dtype=jnp.int32).at[iy, ix].add(1, mode="drop")
+
+
+def _gaussian_smooth(im: jax.Array, sigma: float) -> jax.Array:
+    """
+    Smooth a 2D image with a Gaussian kernel with standard deviation sigma (in pixels),
+    as two 1D convolutions. This matches scipy.ndimage.gaussian_filter() with its
+    default settings: the kernel is truncated at 4 sigma and the image is reflected at
+    the edges.
+    """
+    radius = int(4.0 * sigma + 0.5)
+    if radius == 0:
+        return im
+
+    x = jnp.arange(-radius, radius + 1)
+    kernel = jnp.exp(-0.5 * (x / sigma) ** 2)
+    kernel = kernel / kernel.sum()
+
+    im = jnp.pad(im, radius, mode="symmetric")
+    im = jax.scipy.signal.convolve(im, kernel[None, :], mode="valid")
+    return jax.scipy.signal.convolve(im, kernel[:, None], mode="valid")
+
+
+@partial(jax.jit, static_argnames=("smooth",))
+def _residual_image(
+    model_im: jax.Array, ix: jax.Array, iy: jax.Array, smooth: float | None = None
+) -> tuple[jax.Array, jax.Array]:
+    """
+    Compute the residual of a model image and the number counts of the data binned in
+    the same 2D grid (see _bin_indices()), returning the raw and (optionally) smoothed
+    residual images.
+    """
+    resid = model_im - _count_2d(ix, iy, shape=model_im.shape)
+    if smooth is None:
+        return resid, resid
+    return resid, _gaussian_smooth(resid, smooth)
 
 
 def _plot_projections(grids, ims, axes=None, label=True, pcolormesh_kwargs=None):
@@ -2,6 +2,7 @@ from typing import Any
 
 import jax
 import jax.numpy as jnp
+from jax.typing import ArrayLike
 
 from ._typing import CoordinateName
 
@@ -65,3 +66,44 @@ def atleast_2d(arr: jax.Array, axis: int = 0) -> jax.Array:
     elif len(jnp.shape(arr)) == 1:
         return jnp.expand_dims(arr, axis)
     return arr
+
+
+def simpson_weights(x: ArrayLike) -> jax.Array:
+    """Quadrature weights for integrating samples at the points x with Simpson's rule.
+
+    The integral of samples y(x) is then given by `sum(weights * y)`. This is the
+    composite Simpson's rule for (possibly) non-uniformly spaced samples, and matches
+    `scipy.integrate.simpson`: with an even number of samples, the last interval is
+    integrated with a parabola through the last three samples (Cartwright 2017). Note
+    that some weights can be negative for strongly non-uniform spacing.
+
+    Parameters
+    ----------
+    x
+        A 1D array of (sorted) sample points.
+    """
+    x = jnp.asarray(x, dtype=jnp.result_type(x, float))
+    n = x.shape[0]
+    weights = jnp.zeros_like(x)
+    if n < 2:
+        return weights
+    if n == 2:
+        return weights + 0.5 * (x[1] - x[0])
+
+    # Parabolas through consecutive triples of samples, (x0, x1, x2), (x2, x3, x4), ...:
+    m = n if n % 2 else n - 1
+    h = jnp.diff(x[:m])
+    h0, h1 = h[0::2], h[1::2]
+    hsum = h0 + h1
+    weights = weights.at[0 : m - 1 : 2].add(hsum / 6 * (2 - h1 / h0))
+    weights = weights.at[1:m:2].add(hsum**3 / (6 * h0 * h1))
+    weights = weights.at[2:m:2].add(hsum / 6 * (2 - h0 / h1))
+
+    if n % 2 == 0:
+        # The last interval, using the parabola through the last three samples:
+        h1, h2 = x[-2] - x[-3], x[-1] - x[-2]
+        weights = weights.at[-1].add((2 * h2**2 + 3 * h1 * h2) / (6 * (h1 + h2)))
+        weights = weights.at[-2].add((h2**2 + 3 * h1 * h2) / (6 * h1))
+        weights = weights.at[-3].add(-(h2**3) / (6 * h1 * (h1 + h2)))
+
+    return weights
@@ -27,11 +27,18 @@ class BaseTestConcatenated:
         x = self.setup_dist()
         assert x.event_shape == (3,)
 
+    @pytest.mark.slow
     @pytest.mark.parametrize(("value", "expected_shape"), values_expected_shape)
     def test_logprob(self, value, expected_shape):
         x = self.setup_dist()
         assert x.log_prob(value).shape == expected_shape
 
+    def test_logprob_all_shapes(self):
+        x = self.setup_dist()
+        for value, expected_shape in self.values_expected_shape:
+            assert x.log_prob(value).shape == expected_shape
+
+    @pytest.mark.slow
     @pytest.mark.parametrize("sample_shape", sample_shapes)
     def test_sample(self, sample_shape):
         x = self.setup_dist()
@@ -39,6 +46,12 @@ class BaseTestConcatenated:
         samples = x.sample(jax.random.PRNGKey(0), sample_shape=sample_shape)
         assert samples.shape == (*sample_shape, 3)
 
+    def test_sample_all_shapes(self):
+        x = self.setup_dist()
+        for sample_shape in self.sample_shapes:
+            samples = x.sample(jax.random.PRNGKey(0), sample_shape=sample_shape)
+            assert samples.shape == (*sample_shape, 3)
+
     def test_numpyro_predictive(self):
         def model():
             x = self.setup_dist()
@@ -97,6 +110,7 @@ class TestUnivariateSpline:
         x = self.setup_dist()
         assert x.log_prob(value).shape == expected_shape
 
+    @pytest.mark.slow
     @pytest.mark.parametrize("sample_shape", sample_shapes)
     def test_sample(self, sample_shape):
         x = self.setup_dist()
@@ -104,6 +118,12 @@ class TestUnivariateSpline:
         samples = x.sample(jax.random.PRNGKey(0), sample_shape=sample_shape)
         assert samples.shape == (*sample_shape, self.x.size, 5)
 
+    def test_sample_all_shapes(self):
+        x = self.setup_dist()
+        for sample_shape in self.sample_shapes:
+            samples = x.sample(jax.random.PRNGKey(0), sample_shape=sample_shape)
+            assert samples.shape == (*sample_shape, self.x.size, 5)
+
     @pytest.mark.xfail
     def test_numpyro_predictive(self):
         # TODO: maybe this doesn't work...
@@ -148,9 +168,27 @@ class TestConstraintsTransform:
         )
         assert all(c(test_data) == jnp.array([True, False]))
 
+    def test_transform_cache(self):
+        c = self.setup_constraints()
+        trans = c.transform
+        assert c.transform is trans
+        assert _transform_to_concatenated(c) is trans
+
+        # The transform is rebuilt if the constraints or sizes change:
+        c.constraints = [*c.constraints[:3], dist.constraints.real]
+        trans2 = c.transform
+        assert trans2 is not trans
+        assert jnp.allclose(trans2(jnp.full(6, -2.0))[-2:], -2.0)
+
+        c.sizes = [1, 1, 1, 3]
+        trans3 = c.transform
+        assert trans3 is not trans2
+        assert trans3.sizes == [1, 1, 1, 3]
+
     def test_transforms(self):
         c = self.setup_constraints()
         trans = _transform_to_concatenated(c)
+        assert _transform_to_concatenated(c) is trans
 
         test_data = jnp.full(6, 0.5)
         assert trans(test_data).shape == test_data.shape
@@ -1,9 +1,13 @@
+import jax
 import jax.numpy as jnp
 import numpy as np
 import numpyro.distributions as dist
 import pytest
 
-from stream_membership.distributions.gmm import IndependentGMM
+from stream_membership.distributions.gmm import (
+    IndependentGMM,
+    _standard_truncated_icdf,
+)
 
 
 @pytest.mark.parametrize(
@@ -57,3 +61,134 @@ def test_gridgmm(kwargs):
     assert np.all(np.isfinite(logprob_vals[check]))
     assert np.all(~np.isfinite(logprob_vals[~check]))
     assert np.all(logprob_vals[check] >= gmm_notrunc.log_prob(vals[check]))
+
+
+def test_gridgmm_jit():
+    """
+    The distribution should survive being passed through a jax.jit-compiled function
+    """
+    mix = dist.Categorical(probs=jnp.array([0.8, 0.2]))
+    gmm = IndependentGMM(
+        mix,
+        locs=np.array([[1.0, 2.0, 0.0], [1.5, 0.5, -1]]).T,
+        scales=0.5,
+        low=-1.0,
+        high=3.0,
+    )
+
+    rng = np.random.default_rng(seed=42)
+    vals = rng.uniform(-2, 4, size=(10, gmm._D))
+
+    logprob_vals = jax.jit(lambda d, x: d.log_prob(x))(gmm, vals)
+    assert np.allclose(logprob_vals, gmm.log_prob(vals))
+
+
+def test_gridgmm_vmap():
+    """
+    Evaluating the distribution for a batch of parameters with jax.vmap
+    """
+    mix = dist.Categorical(probs=jnp.array([0.8, 0.2]))
+    rng = np.random.default_rng(seed=42)
+    all_locs = rng.normal(size=(4, 3, 2))
+    vals = rng.uniform(-2, 4, size=(10, 3))
+
+    def log_prob(locs):
+        return IndependentGMM(mix, locs=locs, scales=0.5, low=-1.0).log_prob(vals)
+
+    logprob_vals = jax.vmap(log_prob)(all_locs)
+    assert logprob_vals.shape == (4, 10)
+    assert np.allclose(logprob_vals, np.stack([log_prob(locs) for locs in all_locs]))
+
+
+@pytest.mark.parametrize("sample_shape", [(), (4,), (100, 5)])
+def test_gridgmm_sample(sample_shape):
+    """
+    Samples should have the right shape and be within the truncation bounds
+    """
+    mix = dist.Categorical(probs=jnp.array([0.8, 0.2]))
+    gmm = IndependentGMM(
+        mix,
+        locs=np.array([[1.0, 2.0, 0.0], [1.5, 0.5, -1]]).T,
+        scales=np.array([[1.0, 1.0, 2.0], [2, 1, 1]]).T,
+        low=np.array([0.0, -10.0, 1.0])[:, None],
+        high=np.array([2.2, 1.5, 3.5])[:, None],
+    )
+
+    samples = gmm.sample(jax.random.PRNGKey(0), sample_shape=sample_shape)
+    assert samples.shape == (*sample_shape, gmm._D)
+    assert np.all(gmm.support.check(samples[..., None]))
+    assert np.all(np.isfinite(gmm.log_prob(samples.reshape(-1, gmm._D))))
+
+
+def test_gridgmm_bounds():
+    """
+    The cdf, mean, and variance should respect the truncation bounds
+    """
+    mix = dist.Categorical(probs=jnp.array([0.8, 0.2]))
+    gmm = IndependentGMM(
+        mix,
+        locs=np.array([[1.0, 2.0, 0.0], [1.5, 0.5, -1]]).T,
+        scales=np.array([[1.0, 1.0, 2.0], [2, 1, 1]]).T,
+        low=np.array([0.0, -10.0, 1.0])[:, None],
+        high=np.array([2.2, 1.5, 3.5])[:, None],
+    )
+    low, high = gmm._low[:, 0], gmm._high[:, 0]
+    assert np.allclose(gmm.cdf(low), 0.0)
+    assert np.allclose(gmm.cdf(high), 1.0, atol=1e-6)
+
+    samples = gmm.sample(jax.random.PRNGKey(0), sample_shape=(100_000,))
+    value = np.array([1.0, 0.0, 2.0])
+    assert np.allclose(gmm.cdf(value), np.mean(samples <= value, axis=0), atol=5e-3)
+    assert np.allclose(gmm.mean, samples.mean(axis=0), atol=5e-3)
+    assert np.allclose(gmm.variance, samples.var(axis=0), atol=5e-3)
+
+    # Without bounds, the moments are those of the untruncated Normal mixture:
+    gmm = IndependentGMM(
+        mix, locs=np.array([[0.0, 1.0]]), scales=np.array([[1.0, 2.0]])
+    )
+    assert np.allclose(gmm.mean, 0.2)
+    assert np.allclose(gmm.variance, 0.8 * 1.0 + 0.2 * 4.0 + 0.8 * 0.2)
+
+
+def test_gridgmm_sample_edge_draws():
+    """
+    The smallest and largest uniform draws in the inverse-CDF sampling should still
+    give finite values on the correct side of the mean, with and without truncation
+    """
+    inf = jnp.float32(jnp.inf)
+    for a, b in [(-inf, inf), (jnp.float32(-1.0), jnp.float32(2.0))]:
+        z = _standard_truncated_icdf(jnp.array([0.0, 1.0], dtype=jnp.float32), a, b)
+        assert np.all(np.isfinite(z))
+        assert z[0] < 0 < z[1]
+        assert a <= z[0]
+        assert z[1] <= b
+
+    # All of the mass is at the inner bound if the CDF underflows:
+    z = _standard_truncated_icdf(
+        jnp.array([0.0, 0.5, 1.0], dtype=jnp.float32),
+        jnp.float32(-60.0),
+        jnp.float32(-50.0),
+    )
+    assert np.allclose(z, -50.0)
+
+
+def test_gridgmm_dtype():
+    """
+    The parameters can be stored with a lower precision floating point type
+    """
+    mix = dist.Categorical(probs=jnp.array([0.8, 0.2]))
+    kwargs = {
+        "locs": np.array([[1.0, 2.0, 0.0], [1.5, 0.5, -1]]).T,
+        "scales": 0.5,
+        "low": -1.0,
+        "high": 3.0,
+    }
+    gmm = IndependentGMM(mix, **kwargs)
+    gmm16 = IndependentGMM(mix, **kwargs, dtype=jnp.float16)
+    assert gmm16._locs.dtype == jnp.float16
+    assert gmm16._log_mix_minus_tail.dtype == jnp.float16
+
+    rng = np.random.default_rng(seed=42)
+    vals = rng.uniform(-0.5, 2.5, size=(10, gmm._D))
+    assert np.allclose(gmm16.log_prob(vals), gmm.log_prob(vals), rtol=1e-2)
+    assert gmm16.sample(jax.random.PRNGKey(0), (10,)).dtype == jnp.float16
@@ -1,13 +1,16 @@
+import equinox as eqx
 import jax
 import jax.numpy as jnp
+import matplotlib.pyplot as plt
 import numpyro
 import numpyro.distributions as dist
 import pytest
 from numpyro.infer import SVI, Predictive, Trace_ELBO
 from numpyro.infer.autoguide import AutoDelta
+from numpyro.infer.util import log_density
 from scipy.interpolate import InterpolatedUnivariateSpline
 
-from stream_membership import ModelComponent
+from stream_membership import ComponentMixtureModel, ModelComponent
 from stream_membership.distributions import (
     IndependentGMM,
     NormalSpline,
@@ -238,3 +241,240 @@ def test_sample_order(cond_data, expect):
                 },
                 conditional_data=cond_data,
             )
+
+
+def _make_grid_model(name="test", loc=0.0):
+    return ModelComponent(
+        name=name,
+        coord_distributions={
+            "phi1": dist.Uniform,
+            "phi2": dist.Normal,
+            "pm1": dist.TruncatedNormal,
+        },
+        coord_parameters={
+            "phi1": {"low": -10.0, "high": 10.0},
+            "phi2": {"loc": loc, "scale": 1.0},
+            "pm1": {"loc": dist.Normal(0, 1), "scale": 2.0, "low": -5.0, "high": 5.0},
+        },
+    )
+
+
+_grids = {
+    "phi1": jnp.linspace(-10, 10, 41),
+    "phi2": jnp.linspace(-4, 4, 33),
+    "pm1": jnp.linspace(-5, 5, 21),
+}
+
+
+def test_evaluate_float_pars_compile_once(monkeypatch):
+    """New float parameter values reuse the compiled evaluation function"""
+    n_traces = 0
+    eval_numeric = ModelComponent._eval_numeric
+
+    def counting_eval_numeric(*args, **kwargs):
+        nonlocal n_traces
+        n_traces += 1
+        return eval_numeric(*args, **kwargs)
+
+    monkeypatch.setattr(ModelComponent, "_eval_numeric", counting_eval_numeric)
+
+    model = _make_grid_model()
+    _, ln_ps1 = model.evaluate_on_2d_grids({"pm1": {"loc": 0.5}}, _grids)
+    n_traces_first = n_traces
+    _, ln_ps2 = model.evaluate_on_2d_grids({"pm1": {"loc": 0.7}}, _grids)
+    assert n_traces == n_traces_first
+    assert not jnp.allclose(ln_ps1["phi1", "pm1"], ln_ps2["phi1", "pm1"])
+
+
+def test_evaluate_tree_at_copy():
+    """Models built from another model with eqx.tree_at use their own values"""
+    model = _make_grid_model()
+    pars = {"pm1": {"loc": 0.5}}
+    _, ln_ps = model.evaluate_on_2d_grids(pars, _grids)
+
+    model2 = eqx.tree_at(lambda m: m.coord_parameters["phi2"]["loc"], model, 2.0)
+    _, ln_ps2 = model2.evaluate_on_2d_grids(pars, _grids)
+    _, ln_ps2_fresh = _make_grid_model(loc=2.0).evaluate_on_2d_grids(pars, _grids)
+
+    assert not jnp.allclose(ln_ps["phi1", "phi2"], ln_ps2["phi1", "phi2"])
+    assert jnp.allclose(ln_ps2["phi1", "phi2"], ln_ps2_fresh["phi1", "phi2"])
+
+
+@pytest.mark.filterwarnings("ignore:Using `field\\(init=False\\)`:UserWarning")
+def test_mixture_batched_evaluate():
+    """The batched evaluation of a homogeneous mixture matches evaluating each
+    component separately, also when the (fixed) parameters differ between components"""
+    components = [
+        _make_grid_model(name="a", loc=0.0),
+        _make_grid_model(name="b", loc=2.0),
+    ]
+    probs = jnp.array([0.3, 0.7])
+    mix = ComponentMixtureModel(mixing_probs=probs, components=components)
+    pars = {"mixture-probs": probs, "a:pm1:loc": 0.5, "b:pm1:loc": -0.5}
+
+    expanded_pars = mix.expand_numpyro_params(pars)
+    assert mix._homogeneous
+    assert mix._stack_component_pars(expanded_pars) is not None
+
+    _, ln_ps = mix.evaluate_on_2d_grids(pars, _grids)
+    for name_pair, ln_p in ln_ps.items():
+        expected = jax.scipy.special.logsumexp(
+            jnp.stack(
+                [
+                    jnp.log(prob)
+                    + c.evaluate_on_2d_grids(expanded_pars[c.name], _grids)[1][
+                        name_pair
+                    ]
+                    for prob, c in zip(probs, components, strict=True)
+                ]
+            ),
+            axis=0,
+        )
+        assert jnp.allclose(ln_p, expected, atol=1e-5)
+
+
+def test_batch_obs():
+    model = ModelComponent(
+        name="test",
+        coord_distributions={
+            "phi1": dist.Normal,
+            "phi2": dist.Normal,
+            "pm1": dist.Uniform,
+        },
+        coord_parameters={
+            "phi1": {"loc": 0.0, "scale": 2.0},
+            "phi2": {"loc": dist.Normal(0, 1), "scale": 1.0},
+            "pm1": {"low": -5.0, "high": 5.0},
+        },
+    )
+    data = {
+        "phi1": jnp.linspace(-1, 1, 7),
+        "phi2": jnp.linspace(-2, 1, 7),
+        "pm1": jnp.zeros(7),
+    }
+
+    ln_ps = {}
+    for batch_obs in [False, True]:
+        trace = numpyro.handlers.trace(
+            numpyro.handlers.seed(model, jax.random.PRNGKey(0))
+        ).get_trace(data, batch_obs=batch_obs)
+        obs_names = {k for k, v in trace.items() if v["is_observed"]}
+        if batch_obs:
+            assert obs_names == {"test:phi1-phi2:obs-batch", "test:pm1-obs"}
+        else:
+            assert obs_names == {"test:phi1-obs", "test:phi2-obs", "test:pm1-obs"}
+
+        ln_ps[batch_obs], _ = log_density(
+            model, (data,), {"batch_obs": batch_obs}, {"test:phi2:loc": 0.3}
+        )
+
+    assert jnp.allclose(ln_ps[False], ln_ps[True])
+
+    # Batching is the default, and scalar parameters are stacked without being
+    # broadcast to the shape of the data:
+    trace = numpyro.handlers.trace(
+        numpyro.handlers.seed(model, jax.random.PRNGKey(0))
+    ).get_trace(data)
+    batch_dist = trace["test:phi1-phi2:obs-batch"]["fn"]
+    assert batch_dist.batch_shape == ()
+    assert batch_dist.event_shape == (2,)
+
+    # The batched observed sites are not parsed as parameters:
+    samples = Predictive(model, num_samples=3)(jax.random.PRNGKey(1), data)
+    assert "test:phi1-phi2:obs-batch" in samples
+    expanded = model.expand_numpyro_params(samples, skip_invalid=True)
+    assert set(expanded) == {"phi2"}
+    assert set(expanded["phi2"]) == {"loc"}
+    with pytest.raises(ValueError, match="observed site"):
+        model._expand_numpyro_name("test:phi1-phi2:obs-batch")
+
+    # Coordinates with errors are never batched:
+    trace = numpyro.handlers.trace(
+        numpyro.handlers.seed(model, jax.random.PRNGKey(0))
+    ).get_trace(data, err={"phi2": jnp.full(7, 0.1)}, batch_obs=True)
+    assert "test:phi2-obs" in trace
+    assert "test:phi1-phi2:obs-batch" not in trace
+
+
+def test_make_dists_from_key():
+    model = ModelComponent(
+        name="test",
+        coord_distributions={
+            "phi1": dist.Uniform,
+            "phi2": dist.Normal,
+            "pm1": dist.Normal,
+        },
+        coord_parameters={
+            "phi1": {"low": -10.0, "high": 10.0},
+            "phi2": {
+                "loc": {"fn": dist.Normal(0, 1), "sample_shape": (4,)},
+                "scale": (lambda x: x + 100.0, dist.Uniform(0, 1)),
+            },
+            "pm1": {"loc": {"fn": dist.Normal(0, 1), "obs": 3.0}, "scale": 1.0},
+        },
+    )
+    key = jax.random.PRNGKey(0)
+    dists = model._make_dists_from_key(key)
+
+    # Values from dict specs:
+    assert dists["phi2"].loc.shape == (4,)
+    assert jnp.allclose(dists["pm1"].loc, 3.0)
+
+    # The wrapper of tuple specs is applied to the drawn value:
+    assert 100.0 <= dists["phi2"].scale <= 101.0
+
+    # The same key gives the same draws:
+    dists2 = model._make_dists_from_key(key)
+    assert jnp.allclose(dists["phi2"].loc, dists2["phi2"].loc)
+    assert jnp.allclose(dists["phi2"].scale, dists2["phi2"].scale)
+
+    # Pre-built distributions and passed-in parameter values are used as is:
+    phi2_dist = dist.Normal(1.0, 2.0)
+    dists = model._make_dists_from_key(
+        key, pars={"pm1": {"loc": 5.0}}, dists={"phi2": phi2_dist}
+    )
+    assert dists["phi2"] is phi2_dist
+    assert jnp.allclose(dists["pm1"].loc, 5.0)
+
+    # Other numpyro.sample() arguments are still supported:
+    model = ModelComponent(
+        name="test",
+        coord_distributions={"phi1": dist.Normal},
+        coord_parameters={
+            "phi1": {
+                "loc": {"fn": dist.Normal(0, 1), "infer": {"enumerate": None}},
+                "scale": 1.0,
+            }
+        },
+    )
+    assert model._make_dists_from_key(key)["phi1"].loc.shape == ()
+    assert model.sample(key, sample_shape=(3,))["phi1"].shape == (3,)
+
+    # The key is only split if there are priors to draw from, so components with fixed
+    # parameters give the same samples with and without passing in parameters:
+    model = ModelComponent(
+        name="test",
+        coord_distributions={"phi1": dist.Normal},
+        coord_parameters={"phi1": {"loc": 1.0, "scale": 2.0}},
+    )
+    assert jnp.array_equal(
+        model.sample(key, sample_shape=(3,))["phi1"],
+        model.sample(key, sample_shape=(3,), pars={})["phi1"],
+    )
+
+
+def test_plot_residual_projections():
+    model = _make_grid_model()
+    pars = {"pm1": {"loc": 0.5}}
+    data = model.sample(jax.random.PRNGKey(1), (500,), pars=pars)
+
+    for x_coord_name in [None, "phi1"]:
+        fig, axes, _ = model.plot_residual_projections(
+            data,
+            pars,
+            _grids,
+            grid_coord_names=[("phi1", "pm1")],
+            x_coord_name=x_coord_name,
+        )
+        assert len(axes) == 1
+        plt.close(fig)
@@ -0,0 +1,81 @@
+import jax.numpy as jnp
+import numpy as np
+import pytest
+from scipy.ndimage import gaussian_filter
+
+from stream_membership.plot import _bin_indices, _count_2d, _is_uniform, _residual_image
+
+rng = np.random.default_rng(42)
+
+x_edges_cases = [
+    np.linspace(-3, 3, 25, dtype=np.float32),
+    np.sort(rng.uniform(-3, 3, 25)).astype(np.float32),
+]
+y_edges_cases = [
+    np.linspace(-1, 2, 13, dtype=np.float32),
+    (np.geomspace(1, 4, 13) - 2.0).astype(np.float32),
+]
+
+
+def _make_points(x_edges, y_edges, n=1000):
+    # Random points that extend past the edges, plus points exactly on every edge:
+    x = rng.uniform(x_edges[0] - 0.5, x_edges[-1] + 0.5, n)
+    y = rng.uniform(y_edges[0] - 0.5, y_edges[-1] + 0.5, n)
+    x_on_edges, y_on_edges = np.meshgrid(x_edges, y_edges)
+    x = np.concatenate([x, x_on_edges.ravel()]).astype(np.float32)
+    y = np.concatenate([y, y_on_edges.ravel()]).astype(np.float32)
+    return x, y
+
+
+@pytest.mark.parametrize("x_edges", x_edges_cases)
+@pytest.mark.parametrize("y_edges", y_edges_cases)
+def test_count_2d(x_edges, y_edges):
+    x, y = _make_points(x_edges, y_edges)
+
+    ix = _bin_indices(x, x_edges, uniform=_is_uniform(x_edges))
+    iy = _bin_indices(y, y_edges, uniform=_is_uniform(y_edges))
+    counts = _count_2d(ix, iy, shape=(len(y_edges) - 1, len(x_edges) - 1))
+
+    expected, *_ = np.histogram2d(y, x, bins=(y_edges, x_edges))
+    assert np.array_equal(np.asarray(counts), expected)
+
+
+@pytest.mark.parametrize("edges", x_edges_cases + y_edges_cases)
+def test_bin_indices(edges):
+    values = np.concatenate(
+        [rng.uniform(edges[0] - 1, edges[-1] + 1, 1000), edges]
+    ).astype(np.float32)
+
+    # Both code paths agree for uniform edges:
+    idx = _bin_indices(values, edges)
+    if _is_uniform(edges):
+        assert np.array_equal(idx, _bin_indices(values, edges, uniform=True))
+
+    n_bins = len(edges) - 1
+    inside = (values >= edges[0]) & (values <= edges[-1])
+    assert np.all(idx[~inside] == n_bins)
+
+    counts = np.bincount(np.asarray(idx), minlength=n_bins + 1)[:n_bins]
+    expected, _ = np.histogram(values, bins=edges)
+    assert np.array_equal(counts, expected)
+
+
+@pytest.mark.parametrize("smooth", [None, 0.4, 1.5])
+def test_residual_image(smooth):
+    x_edges, y_edges = x_edges_cases[0], y_edges_cases[1]
+    x, y = _make_points(x_edges, y_edges)
+    ix = _bin_indices(x, x_edges, uniform=True)
+    iy = _bin_indices(y, y_edges)
+
+    model_im = rng.uniform(0, 20, (len(y_edges) - 1, len(x_edges) - 1))
+    model_im = jnp.asarray(model_im, dtype=jnp.float32)
+    resid, smooth_resid = _residual_image(model_im, ix, iy, smooth=smooth)
+
+    counts, *_ = np.histogram2d(y, x, bins=(y_edges, x_edges))
+    expected = np.asarray(model_im) - counts
+    assert np.allclose(resid, expected, atol=1e-5)
+
+    if smooth is None:
+        assert np.allclose(smooth_resid, expected, atol=1e-5)
+    else:
+        assert np.allclose(smooth_resid, gaussian_filter(expected, smooth), atol=1e-4)
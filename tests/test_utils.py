@@ -1,6 +1,7 @@
 import numpy as np
+from scipy.integrate import simpson
 
-from stream_membership.utils import get_coord_from_data_dict
+from stream_membership.utils import get_coord_from_data_dict, simpson_weights
 
 
 def test_get_coord_from_data_dict():
@@ -15,3 +16,37 @@ def test_get_coord_from_data_dict():
     data = {("phi1", "phi2"): np.array([[1, 2], [3, 4]])}
     assert np.allclose(get_coord_from_data_dict("phi1", data), [1, 3])
     assert np.allclose(get_coord_from_data_dict("phi2", data), [2, 4])
+
+
+def test_simpson_weights():
+    # Odd number of samples: should match scipy's composite Simpson's rule
+    for n in [3, 5, 11]:
+        x = np.linspace(0, 2.0, n)
+        assert np.isclose(simpson_weights(x) @ np.sin(x), simpson(np.sin(x), x=x))
+
+    # Even number of samples: should still be exact for a linear function
+    x = np.linspace(0, 2.0, 8)
+    assert np.isclose(simpson_weights(x) @ (3 * x + 1), 8.0)
+
+    # Non-uniform spacing: Simpson's rule is exact for a quadratic function
+    x = np.geomspace(1, 10, 11)
+    assert np.isclose(simpson_weights(x) @ x**2, 333.0)
+
+    # Non-uniform spacing, odd number of samples: should match scipy
+    rng = np.random.default_rng(42)
+    for n in [3, 11]:
+        for x in [np.geomspace(1, 10, n), np.sort(rng.uniform(0, 2.0, n))]:
+            assert np.isclose(
+                simpson_weights(x) @ np.sin(x), simpson(np.sin(x), x=x), rtol=1e-5
+            )
+
+    # Non-uniform spacing, even number of samples: the last interval uses a parabola
+    # through the last three samples, so this is still exact for a quadratic function
+    # (and for a linear function with only two samples)
+    for n in [4, 10]:
+        for x in [np.geomspace(1, 10, n), np.sort(rng.uniform(0, 2.0, n))]:
+            expected = (x[-1] ** 3 - x[0] ** 3) / 3 + (x[-1] - x[0])
+            assert np.isclose(simpson_weights(x) @ (x**2 + 1), expected, rtol=1e-5)
+
+    x = np.array([0.5, 2.0])
+    assert np.isclose(simpson_weights(x) @ (3 * x + 1), 7.125)